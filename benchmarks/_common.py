@@ -0,0 +1,59 @@
+#!python3
+"""
+Helpers shared by the benchmark scripts: finding (or generating) a synthetic
+network to run against and timing a function
+"""
+
+import os
+import json
+from time import perf_counter
+
+from benchmarks import synthetic
+from modules import filework
+
+
+def network_folder(data_folder, scale, students_per_campus, seed,
+                   campus_count=None):
+    """
+    Returns the folder (and its network.json info) for a synthetic network
+    with scale times students_per_campus students per campus, generating it
+    unless an identical one is already there. The campuses are the settings
+    campus_list or, if campus_count is given, that many of them (the list
+    padded with made-up ones)
+    """
+    campuses = None
+    if campus_count is None:
+        folder = os.path.join(data_folder, "{}x".format(scale))
+    else:
+        folder = os.path.join(data_folder, "{}campuses".format(campus_count))
+        campuses = filework.read_settings(os.path.join("settings", "settings.yml"))[
+            "campus_list"
+        ][:campus_count]
+        campuses += [
+            "Campus{}".format(i) for i in range(len(campuses) + 1, campus_count + 1)
+        ]
+    students = students_per_campus * scale
+    info_file = os.path.join(folder, "network.json")
+    if os.path.isfile(info_file):
+        with open(info_file, "r") as f:
+            info = json.load(f)
+        if (
+            info["students_per_campus"] == students
+            and info["seed"] == seed
+            and (campuses is None or len(info["campuses"]) == campus_count)
+        ):
+            return folder, info
+    print("Generating {} network...".format(os.path.basename(folder)), flush=True)
+    return folder, synthetic.make_network(
+        folder, students, campuses=campuses, seed=seed
+    )
+
+
+def best_time(func, repeats):
+    """Returns the fastest of repeats calls of func"""
+    times = []
+    for _ in range(repeats):
+        t0 = perf_counter()
+        func()
+        times.append(perf_counter() - t0)
+    return min(times)
@@ -0,0 +1,155 @@
+#!python3
+"""
+Check and benchmark for the per-campus applications reads (see
+filework.split_apps and RunSession's campus_apps option): each campus's
+part of the file is compared with the matching rows of the whole file,
+the clean award tables built from it with the ones built from the whole
+file, and the whole-file read is timed (and its peak memory measured)
+against splitting out one campus or every campus on synthetic networks
+(see benchmarks/synthetic.py; 21x has about 500k applications)
+
+Run from the repo root:
+    python -m benchmarks.bench_apps [-x 1 21] [-r 3]
+"""
+
+import io
+import os
+import argparse
+import tracemalloc
+import pandas as pd
+
+from benchmarks import synthetic
+from benchmarks._common import best_time, network_folder
+from modules import basedata
+from modules import filework
+
+
+def campus_rows(app_df, ros_df, campus):
+    """Returns the rows of the whole file that belong in the campus's part"""
+    students = ros_df.index[ros_df["Campus"] == campus]
+    keep = (app_df["Campus"] == campus) | app_df["hs_student_id"].isin(students)
+    return app_df[keep.values].reset_index(drop=True)
+
+
+def clean_tables(dfs, config, campus, app_df):
+    """Returns the efc and award tables make_clean_gdocs builds for the
+    campus from the given applications"""
+    dfs = dict(dfs, app=app_df)
+    dfs["ros"] = basedata.add_strat_and_grs(
+        dfs["ros"], dfs["strat"], dfs["target"], dfs["acttosat"], campus, False
+    )
+    basedata.make_clean_gdocs(dfs, config, False)
+    # The award rows are indexed by their row in the applications read
+    return dfs["efc"], dfs["award"].reset_index(drop=True)
+
+
+def same_values(result, expected):
+    """Compares values only (a part can infer narrower dtypes than the
+    whole file, e.g. int64 where another campus has a text id)"""
+    try:
+        pd.testing.assert_frame_equal(
+            result.astype(object), expected.astype(object), check_dtype=False
+        )
+    except AssertionError as e:
+        print(e)
+        return False
+    return True
+
+
+def peak_memory(func):
+    """Returns the peak memory (MB) traced while calling func"""
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and time the app splits")
+    parser.add_argument(
+        "-x",
+        "--scales",
+        dest="scales",
+        action="store",
+        type=int,
+        nargs="+",
+        help="Multiples of the network size to run",
+        default=[1, 21],
+    )
+    parser.add_argument(
+        "-n",
+        "--students",
+        dest="students",
+        action="store",
+        type=int,
+        help="Students per campus at 1x",
+        default=synthetic.STUDENTS_PER_CAMPUS,
+    )
+    parser.add_argument(
+        "-r",
+        "--repeats",
+        dest="repeats",
+        action="store",
+        type=int,
+        help="Number of timed runs (best is reported)",
+        default=3,
+    )
+    parser.add_argument(
+        "-d",
+        "--data",
+        dest="data_folder",
+        action="store",
+        help="Folder for the generated networks (reused between runs)",
+        default=os.path.join("benchmarks", "data"),
+    )
+    args = parser.parse_args()
+
+    failures = []
+    cwd = os.getcwd()
+    for scale in args.scales:
+        folder, network = network_folder(args.data_folder, scale, args.students, 0)
+        os.chdir(folder)  # settings paths are relative to the network folder
+        settings_file = os.path.join("settings", "settings.yml")
+        config = filework.process_config(settings_file, "All")
+        fn, cols = config["current_applications"], config["app_fields"]
+        dfs = filework.read_dfs(config, False)
+        ros_df = dfs["ros"]
+        student_campus = dict(zip(ros_df.index, ros_df["Campus"]))
+        campuses = config["campus_list"]
+        print("{}x: {} students".format(scale, network["students"]), flush=True)
+
+        parts = filework.split_apps(fn, student_campus, campuses)
+        for campus in campuses:
+            part_df = filework.read_apps(io.BytesIO(parts[campus]), cols)
+            if not same_values(part_df, campus_rows(dfs["app"], ros_df, campus)):
+                failures.append("{}x {} rows".format(scale, campus))
+        campus = campuses[0]
+        part_df = filework.read_apps(io.BytesIO(parts[campus]), cols)
+        for result, expected in zip(
+            clean_tables(dfs, config, campus, part_df),
+            clean_tables(dfs, config, campus, dfs["app"]),
+        ):
+            if not same_values(result, expected):
+                failures.append("{}x {} clean tables".format(scale, campus))
+
+        def read_one():
+            part = filework.split_apps(fn, student_campus, [campus])[campus]
+            return filework.read_apps(io.BytesIO(part), cols)
+
+        runs = [
+            ("whole file", lambda: filework.read_apps(fn, cols)),
+            ("one campus", read_one),
+            ("split all", lambda: filework.split_apps(fn, student_campus, campuses)),
+        ]
+        for label, func in runs:
+            print(
+                "  {:<11} {:.3f} s, peak {:.0f} MB".format(
+                    label, best_time(func, args.repeats), peak_memory(func)
+                ),
+                flush=True,
+            )
+        os.chdir(cwd)
+
+    if failures:
+        raise SystemExit("Failed for: " + ", ".join(failures))
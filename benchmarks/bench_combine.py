@@ -0,0 +1,179 @@
+#!python3
+"""
+Check and benchmark for combine_all_local_files: the three combined All
+files it writes are compared byte for byte with the ones written by the
+loop it replaced (reading the campuses one at a time, as the reader did
+before the SCHEMA dtypes, and concatenating each onto everything read so
+far), and the two are timed on a synthetic network with many campuses (see
+benchmarks/synthetic.py). The check runs on a copy of the campus files with
+some Acceptances blanked, so a column of whole numbers with blanks is
+covered
+
+Run from the repo root:
+    python -m benchmarks.bench_combine [-c 50] [-r 3]
+"""
+
+import os
+import shutil
+import argparse
+import filecmp
+import tempfile
+import pandas as pd
+
+from benchmarks import synthetic
+from benchmarks._common import best_time, network_folder
+from modules import filework
+
+KEYS = ["efc", "award", "decision"]
+
+
+def baseline_read_local_live_data(dfs, campus, config):
+    """read_local_live_data as it was, without the SCHEMA dtypes"""
+    for key in KEYS:
+        filename = config["live_backup_prefix"] + "-" + campus + "-" + key + ".csv"
+        full_path = os.path.join(config["live_backup_folder"], filename)
+        if os.path.isfile(full_path):
+            if key in ["efc", "decision"]:
+                dfs["live_" + key] = pd.read_csv(full_path, index_col=0)
+            else:
+                dfs["live_" + key] = pd.read_csv(full_path, index_col=False)
+                dfs["live_" + key].drop(["DefaultIndex"], axis=1, inplace=True)
+
+
+def blank_acceptances(config, every=7):
+    """Blanks every nth Acceptances value in the campus efc files"""
+    for campus in config["campus_list"]:
+        filename = config["live_backup_prefix"] + "-" + campus + "-efc.csv"
+        full_path = os.path.join(config["live_backup_folder"], filename)
+        df = pd.read_csv(full_path, index_col=0)
+        df["Acceptances"] = df["Acceptances"].where(
+            pd.Series(range(len(df)), index=df.index) % every != 0
+        )
+        df.to_csv(full_path)
+
+
+def pairwise_combine(dfs, config, debug):
+    """combine_all_local_files as it was: each campus's tables are
+    concatenated onto everything read before them"""
+    big_df = {"live_efc": None, "live_award": None, "live_decision": None}
+    for campus in config["campus_list"]:
+        baseline_read_local_live_data(dfs, campus, config)
+        for key in ["live_efc", "live_award", "live_decision"]:
+            if key in dfs.keys():
+                dfs[key]["Campus"] = campus
+                if isinstance(big_df[key], pd.DataFrame):
+                    big_df[key] = pd.concat([big_df[key], dfs[key]], sort=False)
+                else:
+                    big_df[key] = dfs[key]
+                dfs.pop(key)
+
+    for key in KEYS:
+        if isinstance(big_df["live_" + key], pd.DataFrame):
+            these_fields = config["live_" + key + "_fields"]
+            big_df["live_" + key] = big_df["live_" + key][these_fields]
+            filename = config["live_backup_prefix"] + "-All-" + key + ".csv"
+            full_path = os.path.join(config["live_backup_folder"], filename)
+            if os.path.isfile(full_path):
+                archive_path = os.path.join(config["live_archive_folder"], filename)
+                shutil.copy(full_path, archive_path)
+            index_label = "StudentID" if key in ["efc", "decision"] else "DefaultIndex"
+            big_df["live_" + key].to_csv(full_path, index_label=index_label)
+
+
+def combined_files(config):
+    """Returns the paths of the three combined All files"""
+    return [
+        os.path.join(
+            config["live_backup_folder"],
+            config["live_backup_prefix"] + "-All-" + key + ".csv",
+        )
+        for key in KEYS
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and time the combine mode")
+    parser.add_argument(
+        "-c",
+        "--campuses",
+        dest="campuses",
+        action="store",
+        type=int,
+        help="Number of campuses in the network",
+        default=50,
+    )
+    parser.add_argument(
+        "-n",
+        "--students",
+        dest="students",
+        action="store",
+        type=int,
+        help="Students per campus",
+        default=synthetic.STUDENTS_PER_CAMPUS,
+    )
+    parser.add_argument(
+        "-r",
+        "--repeats",
+        dest="repeats",
+        action="store",
+        type=int,
+        help="Number of timed runs (best is reported)",
+        default=3,
+    )
+    parser.add_argument(
+        "-d",
+        "--data",
+        dest="data_folder",
+        action="store",
+        help="Folder for the generated networks (reused between runs)",
+        default=os.path.join("benchmarks", "data"),
+    )
+    args = parser.parse_args()
+
+    folder, network = network_folder(
+        args.data_folder, 1, args.students, 0, campus_count=args.campuses
+    )
+    os.chdir(folder)  # settings paths are relative to the network folder
+    config = filework.process_config(os.path.join("settings", "settings.yml"), "All")
+    print(
+        "{} campuses, {} students, {} awards".format(
+            len(network["campuses"]), network["students"], network["awards"]
+        ),
+        flush=True,
+    )
+
+    # Both versions write to a copy of the live files, so the generated
+    # network is left as it was
+    with tempfile.TemporaryDirectory() as temp_folder:
+        live_folder = config["live_backup_folder"]
+        config["live_backup_folder"] = os.path.join(temp_folder, "live_backups")
+        config["live_archive_folder"] = os.path.join(temp_folder, "archives")
+        shutil.copytree(
+            live_folder,
+            config["live_backup_folder"],
+            ignore=shutil.ignore_patterns("archives"),
+        )
+        os.makedirs(config["live_archive_folder"])
+        blank_acceptances(config)
+
+        expected_files = [fn + ".expected" for fn in combined_files(config)]
+        pairwise_combine({}, config, False)
+        for fn, expected in zip(combined_files(config), expected_files):
+            shutil.copy(fn, expected)
+        filework.combine_all_local_files({}, config, False)
+        different = [
+            os.path.basename(fn)
+            for fn, expected in zip(combined_files(config), expected_files)
+            if not filecmp.cmp(fn, expected, shallow=False)
+        ]
+        old_time = best_time(lambda: pairwise_combine({}, config, False), args.repeats)
+        new_time = best_time(
+            lambda: filework.combine_all_local_files({}, config, False), args.repeats
+        )
+    print(
+        "  pairwise {:.3f} s, combined once {:.3f} s ({})".format(
+            old_time, new_time, "DIFFERENT" if different else "identical"
+        )
+    )
+    if different:
+        raise SystemExit("Different: " + ", ".join(different))
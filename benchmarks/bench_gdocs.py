@@ -0,0 +1,179 @@
+#!python3
+"""
+Equivalence check and benchmark for basedata.make_clean_gdocs: the "blank"
+EFC and Award tables it builds are compared (values and dtypes) with those
+of the old row-wise version in benchmarks/reference.py, for the whole
+network and each campus, and both are timed on synthetic networks (see
+benchmarks/synthetic.py), with the peak memory of a run. The 10x network
+has about 240k applications
+
+Run from the repo root:
+    python -m benchmarks.bench_gdocs [-x 1 10] [-r 3]
+"""
+
+import os
+import argparse
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+from benchmarks import synthetic
+from benchmarks._common import best_time, network_folder
+from benchmarks.reference import make_clean_gdocs_rowwise
+from modules import basedata
+from modules import filework
+
+
+def campus_inputs(shared_dfs, campus, config):
+    """Returns the dfs make_clean_gdocs uses for the campus"""
+    dfs = dict(shared_dfs)
+    dfs["ros"] = basedata.add_strat_and_grs(
+        dfs["ros"], dfs["strat"], dfs["target"], dfs["acttosat"], campus, False
+    )
+    return dfs
+
+
+def mixed_flags(dfs):
+    """Returns a copy of dfs with the application status columns as plain
+    strings and waitlisted/deferred holding a mix of 1, "1", 1.0, "1.0" and
+    blanks"""
+    dfs = dict(dfs)
+    app_df = dfs["app"].copy()
+    for column in filework.APP_CATEGORIES:
+        app_df[column] = app_df[column].astype(object)
+    for column in ["waitlisted", "deferred"]:
+        flags = app_df[column].astype(object)
+        flags[flags == 1] = np.resize(
+            np.array([1, "1", 1.0, "1.0"], dtype=object), int((flags == 1).sum())
+        )
+        flags[flags == 0] = "0"
+        app_df[column] = flags
+    dfs["app"] = app_df
+    return dfs
+
+
+def compare(dfs, config):
+    """Runs both versions on copies of dfs; returns a list of the tables
+    that differ (after printing the differences). Categorical columns are
+    compared by value"""
+    expected, result = dict(dfs), dict(dfs)
+    make_clean_gdocs_rowwise(expected, config, False)
+    basedata.make_clean_gdocs(result, config, False)
+    different = []
+    for key in ["efc", "award"]:
+        categorical = result[key].select_dtypes("category").columns
+        try:
+            pd.testing.assert_frame_equal(
+                result[key].astype({column: object for column in categorical}),
+                expected[key],
+            )
+        except AssertionError as e:
+            print(e)
+            different.append(key)
+    return different
+
+
+def peak_memory(func, dfs, config):
+    """Returns the peak MB allocated during a run of func on a copy of dfs"""
+    tracemalloc.start()
+    try:
+        func(dict(dfs), config, False)
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and time make_clean_gdocs")
+    parser.add_argument(
+        "-x",
+        "--scales",
+        dest="scales",
+        action="store",
+        type=int,
+        nargs="+",
+        help="Multiples of the network size to run",
+        default=[1, 10],
+    )
+    parser.add_argument(
+        "-n",
+        "--students",
+        dest="students",
+        action="store",
+        type=int,
+        help="Students per campus at 1x",
+        default=synthetic.STUDENTS_PER_CAMPUS,
+    )
+    parser.add_argument(
+        "-r",
+        "--repeats",
+        dest="repeats",
+        action="store",
+        type=int,
+        help="Number of timed runs (best is reported)",
+        default=1,
+    )
+    parser.add_argument(
+        "-d",
+        "--data",
+        dest="data_folder",
+        action="store",
+        help="Folder for the generated networks (reused between runs)",
+        default=os.path.join("benchmarks", "data"),
+    )
+    args = parser.parse_args()
+
+    failures = []
+    cwd = os.getcwd()
+    for scale in args.scales:
+        folder, network = network_folder(args.data_folder, scale, args.students, 0)
+        os.chdir(folder)  # settings paths are relative to the network folder
+        settings_file = os.path.join("settings", "settings.yml")
+        config = filework.process_config(settings_file, "All")
+        shared_dfs = filework.read_dfs(config, False)
+        print(
+            "{}x: {} students, {} applications".format(
+                scale, network["students"], network["applications"]
+            ),
+            flush=True,
+        )
+
+        # Every campus is checked on the smallest network
+        campuses = ["All"]
+        if scale == min(args.scales):
+            campuses += config["campus_list"]
+        identical = 0
+        for campus in campuses:
+            campus_config = filework.process_config(settings_file, campus)
+            if compare(campus_inputs(shared_dfs, campus, campus_config), campus_config):
+                failures.append("{}x {}".format(scale, campus))
+            else:
+                identical += 1
+        if compare(mixed_flags(campus_inputs(shared_dfs, "All", config)), config):
+            failures.append("{}x mixed flags".format(scale))
+        else:
+            identical += 1
+        print(
+            "  Identical output for {} of {} runs".format(identical, len(campuses) + 1)
+        )
+
+        dfs = campus_inputs(shared_dfs, "All", config)
+        times = {}
+        for name, func in [
+            ("row-wise", make_clean_gdocs_rowwise),
+            ("merged", basedata.make_clean_gdocs),
+        ]:
+            times[name] = best_time(
+                lambda: func(dict(dfs), config, False), args.repeats
+            )
+            print(
+                "  {:<10} {:>9.3f} seconds {:>9.1f} MB peak".format(
+                    name, times[name], peak_memory(func, dfs, config)
+                ),
+                flush=True,
+            )
+        print("  Speedup    {:>9.1f}x".format(times["row-wise"] / times["merged"]))
+        os.chdir(cwd)
+
+    if failures:
+        raise SystemExit("Outputs differ for: " + ", ".join(failures))
@@ -0,0 +1,260 @@
+#!python3
+"""
+Offline benchmark for the main processing steps, run against synthetic
+networks (see benchmarks/synthetic.py) at multiples of our network size.
+Each step is timed on the whole network ("All") except the PDFs, which are
+timed for one campus (the combined campus file). Results are saved as json
+in the results folder and each time is compared with the latest saved one
+
+Run from the repo root:
+    python -m benchmarks.bench_pipeline [-x 1 10 100] [-b add_strat_and_grs]
+"""
+
+import os
+import sys
+import copy
+import json
+import glob
+import argparse
+import subprocess
+from datetime import datetime
+from time import perf_counter
+
+from benchmarks import synthetic
+from benchmarks._common import network_folder
+from modules import basedata
+from modules import filework
+from modules import pdf_reports
+from modules import reports
+
+
+def _read_inputs(dfs, config, campus):
+    dfs.update(filework.read_dfs(config, False))
+
+
+def _add_strat_and_grs(dfs, config, campus):
+    dfs["ros"] = basedata.add_strat_and_grs(
+        dfs["ros"], dfs["strat"], dfs["target"], dfs["acttosat"], "All", False
+    )
+
+
+def _make_clean_gdocs(dfs, config, campus):
+    basedata.make_clean_gdocs(dfs, config, False)
+
+
+def _read_live(dfs, config, campus):
+    filework.read_local_live_data(dfs, "All", config, False)
+
+
+def _build_award_df(dfs, config, campus):
+    dfs["award_report"] = reports.build_award_df(dfs, "All", config, False)
+
+
+def _build_student_df(dfs, config, campus):
+    dfs["student_report"] = reports.build_student_df(dfs, "All", config, False)
+
+
+def _create_excel(dfs, config, campus):
+    reports.create_excel(dfs, "All", config, False)
+
+
+def _create_pdfs(dfs, config, campus):
+    # The report tables are rebuilt for just the one campus
+    campus_dfs = dict(dfs)
+    filework.read_local_live_data(campus_dfs, campus, config, False)
+    reports.create_report_tables(campus_dfs, campus, config, False)
+    pdf_reports.create_pdfs(campus_dfs, campus, config, False, single_pdf=False)
+
+
+# In order; each step uses the dfs left by the ones before it. Steps not
+# picked with -b still run (untimed) if a picked step comes after them
+BENCHMARKS = [
+    ("read_inputs", _read_inputs),
+    ("add_strat_and_grs", _add_strat_and_grs),
+    ("make_clean_gdocs", _make_clean_gdocs),
+    ("read_live", _read_live),
+    ("build_award_df", _build_award_df),
+    ("build_student_df", _build_student_df),
+    ("create_excel", _create_excel),
+    ("create_pdfs", _create_pdfs),
+]
+
+
+def _git_commit():
+    """Returns the short hash of HEAD (or "" outside of a git checkout)"""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True
+        )
+        return result.stdout.strip()
+    except OSError:
+        return ""
+
+
+def run_scale(folder, names, repeats):
+    """Times the named benchmarks inside a generated network folder.
+    Returns a dict of name -> best seconds"""
+    cwd = os.getcwd()
+    os.chdir(folder)  # settings paths are relative to the network folder
+    try:
+        settings_file = os.path.join("settings", "settings.yml")
+        config = filework.process_config(settings_file, "All")
+        campus = config["campus_list"][0]
+        last = max(i for i, (name, _) in enumerate(BENCHMARKS) if name in names)
+        dfs = {}
+        times = {}
+        for name, func in BENCHMARKS[: last + 1]:
+            if name not in names:
+                func(dfs, config, campus)
+                continue
+            best = None
+            for _ in range(repeats):
+                # Each timed run starts from the same dfs (steps modify it)
+                run_dfs = copy.copy(dfs)
+                t0 = perf_counter()
+                func(run_dfs, config, campus)
+                elapsed = perf_counter() - t0
+                best = elapsed if best is None else min(best, elapsed)
+            dfs = run_dfs
+            times[name] = best
+            print("  {:<20} {:>9.3f} seconds".format(name, best), flush=True)
+        return times
+    finally:
+        os.chdir(cwd)
+
+
+def previous_results(results_folder):
+    """Returns the saved results, newest first"""
+    files = sorted(glob.glob(os.path.join(results_folder, "pipeline-*.json")))
+    previous = []
+    for fn in reversed(files):
+        with open(fn, "r") as f:
+            previous.append(json.load(f))
+    return previous
+
+
+def _previous_time(previous, scale, name):
+    """Returns the latest saved time for the benchmark at the scale and the
+    commit it was run at (or None, None)"""
+    for results in previous:
+        seconds = results["scales"].get(scale, {}).get("times", {}).get(name)
+        if seconds is not None:
+            return seconds, results["commit"]
+    return None, None
+
+
+def print_comparison(results, previous):
+    """Prints this run next to the latest saved time of each benchmark"""
+    print(
+        "\n{:<6} {:<20} {:>10} {:>10} {:>8} {:>8}".format(
+            "Scale", "Benchmark", "Seconds", "Previous", "Speedup", "Commit"
+        )
+    )
+    for scale, info in results["scales"].items():
+        for name, seconds in info["times"].items():
+            before, commit = _previous_time(previous, scale, name)
+            if before is None:
+                print("{:<6} {:<20} {:>10.3f}".format(scale, name, seconds))
+            else:
+                print(
+                    "{:<6} {:<20} {:>10.3f} {:>10.3f} {:>7.2f}x {:>8}".format(
+                        scale, name, seconds, before, before / seconds, commit
+                    )
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the processing steps")
+    parser.add_argument(
+        "-x",
+        "--scales",
+        dest="scales",
+        action="store",
+        type=int,
+        nargs="+",
+        help="Multiples of the network size to run",
+        default=[1, 10, 100],
+    )
+    parser.add_argument(
+        "-b",
+        "--benchmarks",
+        dest="benchmarks",
+        action="store",
+        nargs="+",
+        choices=[name for name, _ in BENCHMARKS],
+        help="Benchmarks to time (default is all of them)",
+        default=[name for name, _ in BENCHMARKS],
+    )
+    parser.add_argument(
+        "-n",
+        "--students",
+        dest="students",
+        action="store",
+        type=int,
+        help="Students per campus at 1x",
+        default=synthetic.STUDENTS_PER_CAMPUS,
+    )
+    parser.add_argument(
+        "-r",
+        "--repeats",
+        dest="repeats",
+        action="store",
+        type=int,
+        help="Number of timed runs (best is reported)",
+        default=1,
+    )
+    parser.add_argument(
+        "-d",
+        "--data",
+        dest="data_folder",
+        action="store",
+        help="Folder for the generated networks (reused between runs)",
+        default=os.path.join("benchmarks", "data"),
+    )
+    parser.add_argument(
+        "-o",
+        "--results",
+        dest="results_folder",
+        action="store",
+        help="Folder to save results to",
+        default=os.path.join("benchmarks", "results"),
+    )
+    parser.add_argument(
+        "--seed",
+        dest="seed",
+        action="store",
+        type=int,
+        help="Random seed for the generated networks",
+        default=0,
+    )
+    args = parser.parse_args()
+
+    results = {
+        "commit": _git_commit(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "scales": {},
+    }
+    for scale in args.scales:
+        folder, network = network_folder(
+            args.data_folder, scale, args.students, args.seed
+        )
+        print(
+            "{}x: {} students, {} applications".format(
+                scale, network["students"], network["applications"]
+            ),
+            flush=True,
+        )
+        times = run_scale(folder, args.benchmarks, args.repeats)
+        results["scales"][str(scale)] = {"network": network, "times": times}
+
+    previous = previous_results(args.results_folder)
+    print_comparison(results, previous)
+    os.makedirs(args.results_folder, exist_ok=True)
+    fn = os.path.join(
+        args.results_folder,
+        "pipeline-{}.json".format(datetime.now().strftime("%Y%m%d-%H%M%S")),
+    )
+    with open(fn, "w") as f:
+        json.dump(results, f, indent=1)
+    print("Results saved to {}".format(fn))
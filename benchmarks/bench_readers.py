@@ -0,0 +1,182 @@
+#!python3
+"""
+Check and benchmark for the roster and applications readers
+(filework.read_roster and read_apps, whose numeric columns are converted
+after the read by _coerce): each table is compared cell by cell (values,
+Python types and dtypes) with the read_csv converters the readers used
+before, both on synthetic networks (see benchmarks/synthetic.py; 21x has
+about 500k applications) and on copies seeded with awkward values, and the
+two reads are timed
+
+Run from the repo root:
+    python -m benchmarks.bench_readers [-x 1 21] [-r 3]
+"""
+
+import os
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+from benchmarks import synthetic
+from benchmarks._common import best_time, network_folder
+from modules import filework
+from modules.filework import safe2int, safe2f
+
+# Values the converters treat in different ways, written into the numeric
+# columns of the seeded copies; the NA spellings go in the other columns
+AWKWARD = [
+    "", " ", "N/A", "nan", "NA", "12", " 12 ", "+5", "-0", "007", "1_000", "1__0",
+    "12.0", "1e3", "inf", "0x10", "abc", "²", "99999999999999999999",
+]
+NA_SPELLINGS = ["", "N/A", "NA", "null", "#N/A", "nan", "TBD"]
+
+
+def converter_roster(fn, cols):
+    """read_roster as it was with read_csv converters"""
+    df = pd.read_csv(
+        fn,
+        index_col="StudentID",
+        na_values=["N/A", ""],
+        usecols=cols,
+        encoding="cp1252",
+        converters={
+            "EFC": safe2int,
+            "ACT": safe2int,
+            "InterimSAT": safe2int,
+            "SAT": safe2int,
+            "GPA": safe2f,
+            "StudentID": safe2int,
+        },
+    )
+    return filework.apply_schema(df, "ros")
+
+
+def converter_apps(fn, cols):
+    """read_apps as it was with read_csv converters"""
+    df = pd.read_csv(
+        fn,
+        na_values=[""],
+        encoding="cp1252",
+        usecols=cols,
+        converters={"hs_student_id": safe2int, "NCES": safe2int},
+    )
+    return filework.apply_schema(df, "app")
+
+
+READERS = [
+    ("roster", "current_roster", "roster_fields", filework.read_roster,
+     converter_roster, ["EFC", "ACT", "InterimSAT", "SAT", "GPA"]),
+    ("apps", "current_applications", "app_fields", filework.read_apps,
+     converter_apps, ["hs_student_id", "NCES"]),
+]
+
+
+def differences(result, expected):
+    """Returns a list of the ways result differs from expected"""
+    try:
+        pd.testing.assert_frame_equal(result, expected)
+        pd.testing.assert_index_equal(result.index, expected.index, exact=True)
+    except AssertionError as e:
+        return [str(e)]
+    found = []
+    columns = [(None, result.index, expected.index)] + [
+        (col, result[col], expected[col]) for col in expected.columns
+    ]
+    for col, values, expected_values in columns:
+        if values.dtype != object:
+            continue
+        types = pd.Series([type(x) for x in values])
+        expected_types = pd.Series([type(x) for x in expected_values])
+        if not types.equals(expected_types):
+            found.append("types in {}".format(col or "index"))
+    return found
+
+
+def seeded_copy(fn, folder, numeric, seed):
+    """Returns a copy of the csv with AWKWARD values in the numeric columns
+    and NA spellings in the others (the index column is left alone)"""
+    rng = np.random.default_rng(seed)
+    df = pd.read_csv(fn, dtype=str, keep_default_na=False, encoding="cp1252")
+    for col in df.columns:
+        if col == "StudentID":
+            continue
+        values = AWKWARD if col in numeric else NA_SPELLINGS
+        rows = rng.random(len(df)) < 0.05
+        df.loc[rows, col] = rng.choice(values, rows.sum())
+    seeded = os.path.join(folder, os.path.basename(fn))
+    df.to_csv(seeded, index=False, encoding="cp1252")
+    return seeded
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and time the csv readers")
+    parser.add_argument(
+        "-x",
+        "--scales",
+        dest="scales",
+        action="store",
+        type=int,
+        nargs="+",
+        help="Multiples of the network size to run",
+        default=[1, 21],
+    )
+    parser.add_argument(
+        "-n",
+        "--students",
+        dest="students",
+        action="store",
+        type=int,
+        help="Students per campus at 1x",
+        default=synthetic.STUDENTS_PER_CAMPUS,
+    )
+    parser.add_argument(
+        "-r",
+        "--repeats",
+        dest="repeats",
+        action="store",
+        type=int,
+        help="Number of timed runs (best is reported)",
+        default=3,
+    )
+    parser.add_argument(
+        "-d",
+        "--data",
+        dest="data_folder",
+        action="store",
+        help="Folder for the generated networks (reused between runs)",
+        default=os.path.join("benchmarks", "data"),
+    )
+    args = parser.parse_args()
+
+    failures = []
+    cwd = os.getcwd()
+    for scale in args.scales:
+        folder, network = network_folder(args.data_folder, scale, args.students, 0)
+        os.chdir(folder)  # settings paths are relative to the network folder
+        settings_file = os.path.join("settings", "settings.yml")
+        config = filework.process_config(settings_file, "All")
+        print("{}x: {} students".format(scale, network["students"]), flush=True)
+
+        for name, file_key, cols_key, read, old_read, numeric in READERS:
+            fn, cols = config[file_key], config[cols_key]
+            with tempfile.TemporaryDirectory() as temp:
+                seeded = seeded_copy(fn, temp, numeric, scale)
+                for label, path in [("", fn), (" seeded", seeded)]:
+                    found = differences(read(path, cols), old_read(path, cols))
+                    for difference in found:
+                        print(difference)
+                    if found:
+                        failures.append("{}x {}{}".format(scale, name, label))
+            old_time = best_time(lambda: old_read(fn, cols), args.repeats)
+            new_time = best_time(lambda: read(fn, cols), args.repeats)
+            print(
+                "  {:<7} {:>8} rows: converters {:.3f} s, coerced {:.3f} s".format(
+                    name, len(read(fn, cols)), old_time, new_time
+                ),
+                flush=True,
+            )
+        os.chdir(cwd)
+
+    if failures:
+        raise SystemExit("Failed for: " + ", ".join(failures))
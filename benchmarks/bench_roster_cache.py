@@ -0,0 +1,145 @@
+#!python3
+"""
+Check and benchmark for the enriched roster cache (filework.save_columnar
+and read_columnar, used by the enrich_roster stage): the roster loaded back
+from the cache is compared (values and dtypes) with the one computed by
+add_strat_and_grs for the whole network and one campus, a change to any of
+the four source files has to miss the cache, and computing is timed against
+loading on synthetic networks (see benchmarks/synthetic.py)
+
+Run from the repo root:
+    python -m benchmarks.bench_roster_cache [-x 1 10] [-r 3]
+"""
+
+import os
+import shutil
+import argparse
+import tempfile
+import pandas as pd
+
+from benchmarks import synthetic
+from benchmarks._common import best_time, network_folder
+from modules import basedata
+from modules import filework
+
+SOURCES = ["current_roster", "strategies", "targets", "acttosat"]
+
+
+def source_digest(config, campus):
+    """Returns the digest the enrich_roster stage keys the cache on"""
+    files = [config[key] for key in SOURCES]
+    return filework.file_digest(files, campus, config["roster_fields"])
+
+
+def enrich(dfs, campus):
+    """Returns the roster enriched for the campus"""
+    return basedata.add_strat_and_grs(
+        dfs["ros"], dfs["strat"], dfs["target"], dfs["acttosat"], campus, False
+    )
+
+
+def check_invalidation(config, campus):
+    """Returns the source files whose change doesn't change the digest"""
+    missed = []
+    digest = source_digest(config, campus)
+    with tempfile.TemporaryDirectory() as folder:
+        for key in SOURCES:
+            changed = dict(config)
+            changed[key] = os.path.join(folder, os.path.basename(config[key]))
+            shutil.copy(config[key], changed[key])
+            with open(changed[key], "a") as f:
+                f.write("\n")
+            if source_digest(changed, campus) == digest:
+                missed.append(key)
+    return missed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and time the roster cache")
+    parser.add_argument(
+        "-x",
+        "--scales",
+        dest="scales",
+        action="store",
+        type=int,
+        nargs="+",
+        help="Multiples of the network size to run",
+        default=[1, 10],
+    )
+    parser.add_argument(
+        "-n",
+        "--students",
+        dest="students",
+        action="store",
+        type=int,
+        help="Students per campus at 1x",
+        default=synthetic.STUDENTS_PER_CAMPUS,
+    )
+    parser.add_argument(
+        "-r",
+        "--repeats",
+        dest="repeats",
+        action="store",
+        type=int,
+        help="Number of timed runs (best is reported)",
+        default=3,
+    )
+    parser.add_argument(
+        "-d",
+        "--data",
+        dest="data_folder",
+        action="store",
+        help="Folder for the generated networks (reused between runs)",
+        default=os.path.join("benchmarks", "data"),
+    )
+    args = parser.parse_args()
+
+    failures = []
+    cwd = os.getcwd()
+    for scale in args.scales:
+        folder, network = network_folder(args.data_folder, scale, args.students, 0)
+        os.chdir(folder)  # settings paths are relative to the network folder
+        settings_file = os.path.join("settings", "settings.yml")
+        config = filework.process_config(settings_file, "All")
+        dfs = filework.read_dfs(config, False)
+        print("{}x: {} students".format(scale, network["students"]), flush=True)
+
+        for campus in ["All", config["campus_list"][0]]:
+            source = source_digest(config, campus)
+            expected = enrich(dfs, campus)
+            with tempfile.TemporaryDirectory() as cache_folder:
+                cache = os.path.join(cache_folder, campus)
+                save_time = best_time(
+                    lambda: filework.save_columnar(cache, expected, source),
+                    args.repeats,
+                )
+                load_time = best_time(
+                    lambda: filework.read_columnar(cache, source), args.repeats
+                )
+                result = filework.read_columnar(cache, source)
+                stale = filework.read_columnar(cache, source + "x")
+            try:
+                pd.testing.assert_frame_equal(result, expected)
+                status = "identical"
+            except AssertionError as e:
+                print(e)
+                status = "DIFFERENT"
+                failures.append("{}x {}".format(scale, campus))
+            if stale is not None:
+                failures.append("{}x {} stale".format(scale, campus))
+            compute_time = best_time(lambda: enrich(dfs, campus), args.repeats)
+            print(
+                "  {:<10} compute {:.3f} s, save {:.3f} s, load {:.3f} s ({})".format(
+                    campus, compute_time, save_time, load_time, status
+                ),
+                flush=True,
+            )
+
+        missed = check_invalidation(config, "All")
+        if missed:
+            print("  Changes not noticed: " + ", ".join(missed))
+            failures.extend("{}x {}".format(scale, key) for key in missed)
+        os.chdir(cwd)
+
+    if failures:
+        raise SystemExit("Failed for: " + ", ".join(failures))
@@ -0,0 +1,69 @@
+#!python3
+"""
+Benchmark for loading shared inputs over a full "-ca All" run: re-reading
+the settings and csv inputs for every campus (the old behavior) vs. loading
+them once in a RunSession
+
+Run from the repo root (input paths in the settings file are relative):
+    python -m benchmarks.bench_session [-s settings/settings.yml] [-r 3]
+"""
+
+import argparse
+from time import perf_counter
+
+from modules import filework
+from modules.session import RunSession
+
+
+def per_campus_reads(settings_file):
+    """Mirrors the old main(): parse settings and read inputs per campus"""
+    campus_list = filework.process_config(settings_file, "All")["campus_list"]
+    for campus in campus_list:
+        config = filework.process_config(settings_file, campus)
+        filework.read_dfs(config, False)
+
+
+def session_reads(settings_file):
+    """Same work through a single RunSession"""
+    session = RunSession(settings_file)
+    for campus in session.config("All")["campus_list"]:
+        session.config(campus)
+        session.dfs(campus, False)
+
+
+def best_of(func, settings_file, repeats):
+    """Returns the fastest wall time of several runs"""
+    times = []
+    for _ in range(repeats):
+        t0 = perf_counter()
+        func(settings_file)
+        times.append(perf_counter() - t0)
+    return min(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark shared input loading")
+    parser.add_argument(
+        "-s",
+        "--settings",
+        dest="settings_file",
+        action="store",
+        help="Name/path of yaml file with detailed settings",
+        default="settings/settings.yml",
+    )
+    parser.add_argument(
+        "-r",
+        "--repeats",
+        dest="repeats",
+        action="store",
+        type=int,
+        help="Number of timed runs (best is reported)",
+        default=3,
+    )
+    args = parser.parse_args()
+
+    old = best_of(per_campus_reads, args.settings_file, args.repeats)
+    new = best_of(session_reads, args.settings_file, args.repeats)
+    print("Per-campus reads: {:.2f} seconds".format(old))
+    print("RunSession reads: {:.2f} seconds".format(new))
+    print("Saved {:.2f} seconds ({:.1f}x faster)".format(old - new, old / new))
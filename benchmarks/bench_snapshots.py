@@ -0,0 +1,183 @@
+#!python3
+"""
+Check and benchmark for the live snapshot store (filework.save_live_snapshot
+and read_live_snapshot): a season of weekly saves of every campus's live
+tables, with a few cells edited each week, is written to a temporary store.
+Every (campus, tab, week) is loaded back and compared with what was saved,
+the objects are counted against the distinct files saved, the store's size is
+compared with keeping every csv, and loading the oldest snapshot is timed
+against the latest (see benchmarks/synthetic.py for the networks)
+
+Run from the repo root:
+    python -m benchmarks.bench_snapshots [-x 1] [-w 20]
+"""
+
+import os
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from benchmarks import synthetic
+from benchmarks._common import best_time, network_folder
+from modules import filework
+
+KEYS = ["efc", "award", "decision"]
+
+
+def folder_size(folder):
+    """Returns the total size in bytes of the files under folder"""
+    return sum(
+        os.path.getsize(os.path.join(path, name))
+        for path, _, names in os.walk(folder)
+        for name in names
+    )
+
+
+def edit_some(rng, df, cells):
+    """Returns a copy of df with cells values copied from other rows (so
+    the dtypes don't change)"""
+    df = df.copy()
+    for _ in range(cells):
+        col = rng.integers(df.shape[1])
+        row, other = rng.integers(len(df), size=2)
+        df.iloc[row, col] = df.iloc[other, col]
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and time the snapshots")
+    parser.add_argument(
+        "-x",
+        "--scale",
+        dest="scale",
+        action="store",
+        type=int,
+        help="Multiple of the network size to run",
+        default=1,
+    )
+    parser.add_argument(
+        "-n",
+        "--students",
+        dest="students",
+        action="store",
+        type=int,
+        help="Students per campus at 1x",
+        default=synthetic.STUDENTS_PER_CAMPUS,
+    )
+    parser.add_argument(
+        "-w",
+        "--weeks",
+        dest="weeks",
+        action="store",
+        type=int,
+        help="Number of weekly saves",
+        default=20,
+    )
+    parser.add_argument(
+        "-r",
+        "--repeats",
+        dest="repeats",
+        action="store",
+        type=int,
+        help="Number of timed runs (best is reported)",
+        default=5,
+    )
+    parser.add_argument(
+        "-d",
+        "--data",
+        dest="data_folder",
+        action="store",
+        help="Folder for the generated networks (reused between runs)",
+        default=os.path.join("benchmarks", "data"),
+    )
+    args = parser.parse_args()
+
+    folder, network = network_folder(args.data_folder, args.scale, args.students, 0)
+    os.chdir(folder)  # settings paths are relative to the network folder
+    config = filework.process_config(os.path.join("settings", "settings.yml"), "All")
+    campuses = config["campus_list"]
+    tables = {}
+    for campus in campuses:
+        filework.read_local_live_data(tables, campus, config, False)
+        for key in KEYS:
+            tables[(campus, key)] = tables.pop("live_" + key)
+    print(
+        "{}x: {} campuses, {} weeks".format(args.scale, len(campuses), args.weeks),
+        flush=True,
+    )
+
+    rng = np.random.default_rng(0)
+    start = datetime(2022, 1, 3)
+    saved = {}
+    failures = []
+    with tempfile.TemporaryDirectory() as temp:
+        config = dict(
+            config,
+            live_backup_folder=os.path.join(temp, "live"),
+            live_snapshot_folder=os.path.join(temp, "snapshots"),
+        )
+        os.makedirs(config["live_backup_folder"])
+        csv_bytes = 0
+        digests = set()
+        t0 = perf_counter()
+        for week in range(args.weeks):
+            timestamp = (start + timedelta(weeks=week)).strftime(
+                filework.SNAPSHOT_TIME_FORMAT
+            )
+            for (campus, key), df in tables.items():
+                # About a third of the tabs change in a given week
+                if week and rng.random() < 0.3:
+                    df = tables[(campus, key)] = edit_some(rng, df, 3)
+                fn = os.path.join(
+                    config["live_backup_folder"], "{}-{}.csv".format(campus, key)
+                )
+                index_label = "DefaultIndex" if key == "award" else "StudentID"
+                df.to_csv(fn, index_label=index_label)
+                csv_bytes += os.path.getsize(fn)
+                digests.add(filework.file_digest([fn]))
+                filework.save_live_snapshot(config, campus, key, df, fn, timestamp)
+                saved[(campus, key, timestamp)] = df
+        save_time = perf_counter() - t0
+
+        for (campus, key, timestamp), expected in saved.items():
+            try:
+                pd.testing.assert_frame_equal(
+                    filework.read_live_snapshot(config, campus, key, timestamp),
+                    expected,
+                )
+            except AssertionError as e:
+                print(e)
+                failures.append("{} {} {}".format(campus, key, timestamp))
+        objects_folder = os.path.join(config["live_snapshot_folder"], "objects")
+        objects = len(os.listdir(objects_folder))
+        store_bytes = folder_size(config["live_snapshot_folder"])
+
+        campus, key = campuses[0], "award"
+        first = filework.live_snapshots(config, campus, key)["timestamp"].iloc[0]
+        oldest = best_time(
+            lambda: filework.read_live_snapshot(config, campus, key, first),
+            args.repeats,
+        )
+        latest = best_time(
+            lambda: filework.read_live_snapshot(config, campus, key), args.repeats
+        )
+
+    print("  {} saves in {:.2f} s".format(len(saved), save_time))
+    print("  {} objects for {} distinct files".format(objects, len(digests)))
+    print(
+        "  store {:.1f} MB vs {:.1f} MB for every csv".format(
+            store_bytes / 2 ** 20, csv_bytes / 2 ** 20
+        )
+    )
+    print(
+        "  load {} {}: oldest {:.4f} s, latest {:.4f} s".format(
+            campus, key, oldest, latest
+        )
+    )
+    if objects != len(digests):
+        failures.append("objects")
+    if failures:
+        raise SystemExit("Failed for: " + ", ".join(failures))
@@ -0,0 +1,82 @@
+#!python3
+"""
+Benchmark for startup cost: runs "python -X importtime" on process_awards
+and on each of the modules and summarizes the import times, so a new
+top-level import of a heavy library shows up here
+
+Run from the repo root:
+    python -m benchmarks.bench_startup [-r 5] [-t 10]
+"""
+
+import argparse
+import subprocess
+import sys
+
+MODULES = [
+    "process_awards",
+    "modules.stages",
+    "modules.filework",
+    "modules.basedata",
+    "modules.reports",
+    "modules.pdf_reports",
+    "modules.gdocwork",
+    "modules.googleapi",
+]
+
+
+def import_times(module):
+    """Imports the module in a fresh interpreter and returns a dict of
+    imported module name -> (self microseconds, cumulative microseconds)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        # Lines look like "import time:       123 |        456 |   name"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def best_of(module, repeats):
+    """Returns the import_times of the run with the fastest cumulative time"""
+    runs = [import_times(module) for _ in range(repeats)]
+    return min(runs, key=lambda times: times[module][1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark import times")
+    parser.add_argument(
+        "-r",
+        "--repeats",
+        dest="repeats",
+        action="store",
+        type=int,
+        help="Number of timed runs per module (best is reported)",
+        default=5,
+    )
+    parser.add_argument(
+        "-t",
+        "--top",
+        dest="top",
+        action="store",
+        type=int,
+        help="Number of slowest imports to list for process_awards",
+        default=10,
+    )
+    args = parser.parse_args()
+
+    results = {module: best_of(module, args.repeats) for module in MODULES}
+    print("{:<24} {:>12}".format("Module", "Import (ms)"))
+    for module in MODULES:
+        print("{:<24} {:>12.1f}".format(module, results[module][module][1] / 1000))
+
+    print("\nSlowest imports under process_awards (self time)")
+    startup = sorted(results["process_awards"].items(), key=lambda x: -x[1][0])
+    for name, (self_us, cumulative_us) in startup[: args.top]:
+        print("{:<40} {:>8.1f} ms".format(name, self_us / 1000))
@@ -0,0 +1,230 @@
+#!python3
+"""
+Equivalence check and benchmark for basedata.add_strat_and_grs: the array
+version is compared (values and dtypes) against the old row-wise version in
+benchmarks/reference.py on a synthetic roster read the way the real one is,
+plus variants with numeric columns, nan scores and single/empty campuses.
+Then both are timed on a large roster. Each campus's slice of the
+network-wide result (basedata.split_by_campus) is checked against the
+per-campus call the same way, and the two are timed for every campus
+
+Run from the repo root:
+    python -m benchmarks.bench_strat [-n 100000] [-e 5000]
+"""
+
+import os
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+from benchmarks import synthetic
+from benchmarks._common import best_time
+from benchmarks.reference import add_strat_and_grs_rowwise
+from modules import basedata
+from modules import filework
+
+NUMERIC = ["EFC", "GPA", "ACT", "InterimSAT", "SAT"]
+CAMPUSES = ["Baker", "Bulls", "Butler", "Comer", "DRW", "Golder", "Hansberry"]
+
+
+def read_tables(settings_folder):
+    """Returns the strategy, target and ACT to SAT tables"""
+    return [
+        filework.read_standard_csv(os.path.join(settings_folder, fn))
+        for fn in [
+            "strategy_definitions.csv",
+            "targets_by_strategy.csv",
+            "act_to_sat.csv",
+        ]
+    ]
+
+
+def make_roster(students, seed):
+    """Returns a synthetic roster after a round trip through read_roster, so
+    blanks and junk come through as strings as they do in a real run"""
+    rng = np.random.default_rng(seed)
+    per_campus = -(-students // len(CAMPUSES))
+    df = synthetic.make_roster(rng, CAMPUSES, per_campus).iloc[:students]
+    with tempfile.TemporaryDirectory() as folder:
+        fn = os.path.join(folder, "current_students.csv")
+        df.to_csv(fn, index=False)
+        return filework.read_roster(fn, list(df.columns))
+
+
+def roster_variants(roster):
+    """Returns a list of (name, roster, campus) to check"""
+    numeric = roster.copy()
+    for column in NUMERIC:
+        numeric[column] = pd.to_numeric(numeric[column], errors="coerce")
+    whole = numeric.dropna(subset=NUMERIC).copy()
+    for column in ["EFC", "ACT", "InterimSAT", "SAT"]:
+        whole[column] = whole[column].astype(np.int64)
+    # nan (rather than a blank string) in object columns is "real"
+    with_nans = roster.copy()
+    for column in ["GPA", "SAT", "ACT"]:
+        with_nans.loc[with_nans.index[::7], column] = np.nan
+    # SATs between the table's steps of 10 (and past its end) have no strategy
+    odd = numeric.copy()
+    odd["SAT"] += np.resize([0, 5, 4.5, 5.5, 0.5, 1000], len(odd))
+    # Every student has an SAT that's a whole number
+    ints = roster[roster["SAT"].map(lambda x: isinstance(x, int))]
+    # One campus where every student has scores (so its columns are ints)
+    clean = roster.copy()
+    rows = clean["Campus"] == CAMPUSES[0]
+    clean.loc[rows, "GPA"] = 3.5
+    clean.loc[rows, "ACT"] = 25
+    clean.loc[rows, "SAT"] = 1200
+    return [
+        ("as read", roster, "All"),
+        ("numeric", numeric, "All"),
+        ("integers", whole, "All"),
+        ("nans", with_nans, "All"),
+        ("odd SATs", odd, "All"),
+        ("int SATs", ints, "All"),
+        ("clean campus", clean, CAMPUSES[0]),
+        ("one campus", roster, CAMPUSES[0]),
+        ("no students", roster, "Nowhere"),
+    ]
+
+
+def compiled(tables):
+    """Returns the tables as add_strat_and_grs takes them (the row-wise
+    version takes the strategy table as read)"""
+    strat_df, target_df, acttosat_df = tables
+    return [basedata.compile_strategy_grid(strat_df), target_df, acttosat_df]
+
+
+def check_equivalence(roster, tables):
+    """Compares the two versions on each variant; returns the failures"""
+    failures = []
+    for name, df, campus in roster_variants(roster):
+        expected = add_strat_and_grs_rowwise(df, *tables, campus, False)
+        result = basedata.add_strat_and_grs(df, *compiled(tables), campus, False)
+        try:
+            pd.testing.assert_frame_equal(result, expected)
+            print("  {:<12} identical ({} rows)".format(name, len(df)), flush=True)
+        except AssertionError as e:
+            print("  {:<12} DIFFERENT\n{}".format(name, e), flush=True)
+            failures.append(name)
+    return failures
+
+
+def check_campus_split(roster, tables):
+    """Compares each campus's slice of the network-wide result (see
+    basedata.split_by_campus) with the per-campus call for each variant;
+    returns the failures"""
+    failures = []
+    for name, df, _ in roster_variants(roster):
+        split = basedata.split_by_campus(
+            basedata.add_strat_and_grs(df, *compiled(tables), "All", False),
+            tables[2],
+        )
+        for campus in CAMPUSES + ["Nowhere"]:
+            expected = basedata.add_strat_and_grs(
+                df, *compiled(tables), campus, False
+            )
+            try:
+                pd.testing.assert_frame_equal(
+                    basedata.campus_roster(split, campus), expected
+                )
+            except AssertionError as e:
+                print("  {:<12} {} DIFFERENT\n{}".format(name, campus, e), flush=True)
+                failures.append("{} {}".format(name, campus))
+        print("  {:<12} checked {} campuses".format(name, len(CAMPUSES) + 1))
+    return failures
+
+
+def time_campus_split(roster, tables, repeats):
+    """Returns the seconds to enrich every campus with a call each and with
+    one network-wide call plus slices"""
+    compiled_tables = compiled(tables)
+
+    def per_campus():
+        for campus in CAMPUSES:
+            basedata.add_strat_and_grs(roster, *compiled_tables, campus, False)
+
+    def split_once():
+        split = basedata.split_by_campus(
+            basedata.add_strat_and_grs(roster, *compiled_tables, "All", False),
+            tables[2],
+        )
+        for campus in CAMPUSES:
+            basedata.campus_roster(split, campus)
+
+    return best_time(per_campus, repeats), best_time(split_once, repeats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and time add_strat_and_grs")
+    parser.add_argument(
+        "-n",
+        "--students",
+        dest="students",
+        action="store",
+        type=int,
+        help="Roster size for the timing",
+        default=100000,
+    )
+    parser.add_argument(
+        "-e",
+        "--equivalence",
+        dest="equivalence",
+        action="store",
+        type=int,
+        help="Roster size for the equivalence check",
+        default=5000,
+    )
+    parser.add_argument(
+        "-r",
+        "--repeats",
+        dest="repeats",
+        action="store",
+        type=int,
+        help="Number of timed runs (best is reported)",
+        default=1,
+    )
+    parser.add_argument(
+        "-s",
+        "--settings",
+        dest="settings_folder",
+        action="store",
+        help="Folder with the lookup tables",
+        default="settings",
+    )
+    parser.add_argument(
+        "--seed",
+        dest="seed",
+        action="store",
+        type=int,
+        help="Random seed for the rosters",
+        default=0,
+    )
+    args = parser.parse_args()
+
+    tables = read_tables(args.settings_folder)
+    print("Equivalence with the row-wise version:")
+    failures = check_equivalence(make_roster(args.equivalence, args.seed), tables)
+
+    roster = make_roster(args.students, args.seed + 1)
+    print("\nTiming on {} students:".format(len(roster)))
+    times = {}
+    for name, func, func_tables in [
+        ("row-wise", add_strat_and_grs_rowwise, tables),
+        ("array", basedata.add_strat_and_grs, compiled(tables)),
+    ]:
+        times[name] = best_time(
+            lambda: func(roster, *func_tables, "All", False), args.repeats
+        )
+        print("  {:<10} {:>9.3f} seconds".format(name, times[name]), flush=True)
+    print("  Speedup    {:>9.1f}x".format(times["row-wise"] / times["array"]))
+
+    print("\nCampus slices of the network-wide result:")
+    failures += check_campus_split(make_roster(args.equivalence, args.seed), tables)
+    per_campus, split_once = time_campus_split(roster, tables, args.repeats)
+    print(
+        "  {} campuses: {:.3f} seconds called per campus, {:.3f} seconds split "
+        "from one call".format(len(CAMPUSES), per_campus, split_once)
+    )
+    if failures:
+        raise SystemExit("Outputs differ for: " + ", ".join(failures))
@@ -0,0 +1,163 @@
+#!python3
+"""
+Load test for the Google Doc steps against the Apps Script emulator
+(modules/emulator.py): for each campus of a synthetic network (see
+benchmarks/synthetic.py) the emulated doc is filled from the campus's live
+files and then read_current_doc, sync_doc_rows and refresh_decisions are
+timed. Latency and payload limits can be set to mimic the real service
+
+Run from the repo root:
+    python -m benchmarks.bench_sync [-x 10] [-l 1.5] [--per-kb 0.01]
+"""
+
+import os
+import argparse
+import pandas as pd
+from time import perf_counter
+
+from benchmarks import synthetic
+from benchmarks._common import network_folder
+from modules import basedata
+from modules import gdocwork
+from modules import googleapi
+from modules import profiling
+from modules.emulator import ScriptEmulator
+from modules.session import RunSession
+
+STEPS = ["read_doc", "sync_doc_rows", "read_doc_synced", "refresh_decisions"]
+
+
+def run_campus(dfs, campus, config, debug):
+    """Runs the doc steps of the "all" mode for the campus, returning a dict
+    of step -> seconds"""
+    dfs["ros"] = basedata.add_strat_and_grs(
+        dfs["ros"], dfs["strat"], dfs["target"], dfs["acttosat"], campus, False
+    )
+    basedata.make_clean_gdocs(dfs, config, False)
+
+    times = {}
+    for step, func, kwargs in [
+        ("read_doc", gdocwork.read_current_doc, {}),
+        ("sync_doc_rows", gdocwork.sync_doc_rows, {}),
+        ("read_doc_synced", gdocwork.read_current_doc, {"tabs": {"efc", "award"}}),
+        ("refresh_decisions", gdocwork.refresh_decisions, {}),
+    ]:
+        t0 = perf_counter()
+        func(dfs, campus, config, debug, **kwargs)
+        times[step] = perf_counter() - t0
+    return times
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the doc steps")
+    parser.add_argument(
+        "-x",
+        "--scale",
+        dest="scale",
+        action="store",
+        type=int,
+        help="Multiple of the network size to run",
+        default=1,
+    )
+    parser.add_argument(
+        "-n",
+        "--students",
+        dest="students",
+        action="store",
+        type=int,
+        help="Students per campus at 1x",
+        default=synthetic.STUDENTS_PER_CAMPUS,
+    )
+    parser.add_argument(
+        "-ca",
+        "--campus",
+        dest="campus",
+        action="store",
+        help="Campus to run (default is every campus)",
+        default="All",
+    )
+    parser.add_argument(
+        "-l",
+        "--latency",
+        dest="latency",
+        action="store",
+        type=float,
+        help="Seconds added to each Apps Script call",
+        default=0.0,
+    )
+    parser.add_argument(
+        "--per-kb",
+        dest="seconds_per_kb",
+        action="store",
+        type=float,
+        help="Seconds added per KB sent and received",
+        default=0.0,
+    )
+    parser.add_argument(
+        "--max-kb",
+        dest="max_payload_kb",
+        action="store",
+        type=float,
+        help="Fail Apps Script calls bigger than this (0 for no limit)",
+        default=0,
+    )
+    parser.add_argument(
+        "-d",
+        "--data",
+        dest="data_folder",
+        action="store",
+        help="Folder for the generated networks (reused between runs)",
+        default=os.path.join("benchmarks", "data"),
+    )
+    parser.add_argument(
+        "-q",
+        "--quiet",
+        dest="debug",
+        action="store_false",
+        default=True,
+        help="Suppress the per-step messages",
+    )
+    args = parser.parse_args()
+
+    folder, network = network_folder(args.data_folder, args.scale, args.students, 0)
+    os.chdir(folder)  # settings paths are relative to the network folder
+    session = RunSession(os.path.join("settings", "settings.yml"))
+    all_config = session.config("All")
+    emulator = ScriptEmulator(
+        latency=args.latency,
+        seconds_per_kb=args.seconds_per_kb,
+        max_payload_kb=args.max_payload_kb,
+        decision_header=["StudentID"]
+        + [f for f in all_config["live_decision_fields"] if f != "Campus"],
+    )
+    googleapi.set_script_backend(emulator)
+    profiling.enable()
+
+    campuses = all_config["campus_list"] if args.campus == "All" else [args.campus]
+    key = pd.DataFrame(
+        {"ss_key": ["emulated-" + campus for campus in campuses]}, index=campuses
+    )
+    totals = {step: 0.0 for step in STEPS}
+    for campus in campuses:
+        config = session.config(campus)
+        emulator.load_local_live(key.loc[campus, "ss_key"], campus, config)
+        dfs = session.dfs(campus, False)
+        dfs["key"] = key
+        with profiling.campus(campus):
+            times = run_campus(dfs, campus, config, args.debug)
+        print(
+            "{:<10} ".format(campus)
+            + " ".join("{}={:.2f}".format(step, times[step]) for step in STEPS),
+            flush=True,
+        )
+        for step in STEPS:
+            totals[step] += times[step]
+
+    print("\n{:<24} {:>10}".format("Step", "Seconds"))
+    for step in STEPS:
+        print("{:<24} {:>10.2f}".format(step, totals[step]))
+    print("\n{:<32} {:>6} {:>10}".format("Apps Script call", "Count", "Seconds"))
+    script_totals = profiling.summarize(profiling.take_records())
+    for name, t in sorted(script_totals.items(), key=lambda x: -x[1]["wall"]):
+        if name.startswith("script:"):
+            print("{:<32} {:>6} {:>10.2f}".format(name[7:], t["count"], t["wall"]))
@@ -0,0 +1,105 @@
+#!python3
+"""
+Check and benchmark for the compiled reference tables (see
+filework._read_compiled): each table read from its memory-mapped columnar
+copy is compared (values and dtypes) with the one parsed from the csv,
+changing the csv has to rebuild the copy, and parsing is timed against
+loading. Runs on a temporary copy of the settings folder
+
+Run from the repo root:
+    python -m benchmarks.bench_tables [-r 5]
+"""
+
+import os
+import json
+import shutil
+import argparse
+import tempfile
+import pandas as pd
+
+from benchmarks._common import best_time
+from modules import filework
+
+TABLES = [
+    ("all_colleges.csv", filework.read_colleges, filework._parse_colleges),
+    ("strategy_definitions.csv", filework.read_standard_csv, None),
+    ("targets_by_strategy.csv", filework.read_standard_csv, None),
+    ("act_to_sat.csv", filework.read_standard_csv, None),
+    ("app_programs.csv", filework.read_standard_csv, None),
+]
+
+
+def cached_source(fn):
+    """Returns the source recorded in the csv's compiled copy"""
+    with open(os.path.join(os.path.splitext(fn)[0] + ".columns", "meta.json")) as f:
+        return json.load(f)["source"]
+
+
+def check_table(fn, read, parse, repeats):
+    """Returns (parse seconds, load seconds, list of failed checks)"""
+    parse = parse or filework._parse_standard_csv
+    failures = []
+    expected = parse(fn)
+    read(fn)  # builds the compiled copy
+    try:
+        pd.testing.assert_frame_equal(read(fn), expected)
+    except AssertionError as e:
+        print(e)
+        failures.append("different")
+
+    # A changed csv has to be read again (and the copy rebuilt)
+    source = cached_source(fn)
+    with open(fn, "a") as f:
+        f.write("\n")
+    stat = os.stat(fn)
+    os.utime(fn, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    try:
+        pd.testing.assert_frame_equal(read(fn), parse(fn))
+    except AssertionError as e:
+        print(e)
+        failures.append("different after a change")
+    if cached_source(fn) == source:
+        failures.append("not rebuilt")
+    parse_time = best_time(lambda: parse(fn), repeats)
+    return parse_time, best_time(lambda: read(fn), repeats), failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and time the table cache")
+    parser.add_argument(
+        "-r",
+        "--repeats",
+        dest="repeats",
+        action="store",
+        type=int,
+        help="Number of timed runs (best is reported)",
+        default=5,
+    )
+    parser.add_argument(
+        "-s",
+        "--settings",
+        dest="settings_folder",
+        action="store",
+        help="Folder with the reference tables",
+        default="settings",
+    )
+    args = parser.parse_args()
+
+    failures = []
+    print("{:<26} {:>10} {:>10}".format("Table", "Parse (s)", "Load (s)"))
+    with tempfile.TemporaryDirectory() as folder:
+        for name, read, parse in TABLES:
+            fn = os.path.join(folder, name)
+            shutil.copy(os.path.join(args.settings_folder, name), fn)
+            parse_time, load_time, table_failures = check_table(
+                fn, read, parse, args.repeats
+            )
+            print(
+                "{:<26} {:>10.4f} {:>10.4f} {}".format(
+                    name, parse_time, load_time, ", ".join(table_failures)
+                ),
+                flush=True,
+            )
+            failures.extend("{} {}".format(name, f) for f in table_failures)
+    if failures:
+        raise SystemExit("Failed for: " + ", ".join(failures))
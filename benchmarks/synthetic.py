@@ -0,0 +1,338 @@
+#!python3
+"""
+Generator for a synthetic "network" to run the award letter process
+against without real student data or Google Sheets. It writes a self
+contained folder with a copy of settings/ (so the real all_colleges.csv
+NCES IDs and lookup tables are used), a fonts/ copy for the PDFs, the two
+"current" csvs, a bump list and local live_ files for every campus plus the
+combined All files, i.e. everything the report modes read
+
+Run from the repo root:
+    python -m benchmarks.synthetic -o benchmarks/data/1x [-n 160] [-c 17]
+"""
+
+import os
+import json
+import shutil
+import argparse
+import numpy as np
+import pandas as pd
+import yaml
+
+from modules import filework
+
+# Roughly the size of our senior class at each campus
+STUDENTS_PER_CAMPUS = 160
+APPS_PER_STUDENT = 9
+
+RESULT_CODES = {
+    "accepted": 0.38,
+    "denied": 0.14,
+    "cond. accept": 0.03,
+    "summer admit": 0.01,
+    "guar. transfer": 0.01,
+    "unknown": 0.03,
+    "": 0.40,
+}
+STAGES = {
+    "pending": 0.15,
+    "initial materials submitted": 0.35,
+    "mid-year submitted": 0.10,
+    "final submitted": 0.10,
+    "": 0.30,
+}
+APP_TYPES = {"regular decision": 0.6, "early action": 0.3, "interest": 0.1}
+RACES = {"B": 0.45, "H": 0.45, "W": 0.03, "A": 0.03, "M": 0.02, "I": 0.01, "P": 0.01}
+COHORTS = {"HS2022": 0.97, "HS2021": 0.03}
+# Strings that turn up in the numeric roster columns and have to survive the
+# string fallbacks in the readers and add_strat_and_grs
+JUNK = ["INC", "TBD", "?"]
+
+
+def _choice(rng, weights, size):
+    """Draws size values from a dict of value -> weight"""
+    values = list(weights.keys())
+    p = np.array(list(weights.values()), dtype=float)
+    return rng.choice(values, size, p=p / p.sum())
+
+
+def _blank_some(rng, values, fraction, junk=0.0):
+    """Returns an object array with a fraction of blanks (and optionally
+    a fraction of junk strings)"""
+    values = values.astype(object)
+    draw = rng.random(len(values))
+    values[draw < fraction] = ""
+    is_junk = (draw >= fraction) & (draw < fraction + junk)
+    values[is_junk] = rng.choice(JUNK, is_junk.sum())
+    return values
+
+
+def make_roster(rng, campuses, students_per_campus):
+    """Returns a roster DataFrame shaped like current_students.csv"""
+    n = len(campuses) * students_per_campus
+    ids = rng.choice(np.arange(100000, 100000 + n * 10), n, replace=False)
+    gpa = np.clip(rng.normal(3.0, 0.6, n), 1.0, 4.6).round(2)
+    # SATs are reported in steps of 10 and track GPA
+    sat = np.clip(rng.normal(430 + 185 * gpa, 90), 400, 1600)
+    return pd.DataFrame(
+        {
+            "Campus": np.repeat(campuses, students_per_campus),
+            "EFC": _blank_some(
+                rng, np.where(rng.random(n) < 0.1, -1, rng.integers(0, 25000, n)), 0.1
+            ),
+            "LastFirst": ["Last{0}, First{0}".format(i) for i in ids],
+            "StudentID": ids,
+            "GPA": _blank_some(rng, gpa, 0.03, junk=0.005),
+            "ACT": _blank_some(rng, rng.integers(12, 37, n), 0.4),
+            "InterimSAT": _blank_some(rng, (sat * 0.95 // 10 * 10).astype(int), 0.5),
+            "SAT": _blank_some(rng, (sat // 10 * 10).astype(int), 0.3, junk=0.005),
+            "Race/ Eth": _choice(rng, RACES, n),
+            "Counselor": rng.choice(["Counselor{}".format(i) for i in range(4)], n),
+            "Advisor": rng.choice(["Advisor{}".format(i) for i in range(12)], n),
+            "Cohort": _choice(rng, COHORTS, n),
+            "Gender": rng.choice(["F", "M"], n),
+        }
+    )
+
+
+def make_applications(rng, roster, colleges):
+    """Returns an applications DataFrame shaped like current_applications.csv,
+    using NCES IDs from the real colleges table (weighted towards the local
+    and Illinois public colleges most of our students apply to)"""
+    weight = np.where(
+        (colleges["ChiLocal"] == 1) | (colleges["IL Public"] == 1),
+        40.0,
+        np.where(colleges["Adj6yrGrad_All"].notna(), 1.0, 0.1),
+    )
+    n = len(roster) * APPS_PER_STUDENT
+    student = rng.integers(0, len(roster), n)
+    college = rng.choice(len(colleges), n, p=weight / weight.sum())
+    apps = pd.DataFrame(
+        {
+            "Campus": roster["Campus"].values[student],
+            "hs_student_id": roster["StudentID"].values[student],
+            "last_name": "Last",
+            "first_name": "First",
+            "middle_name": "",
+            "collegename": colleges["INSTNM"].values[college],
+            "stage": _choice(rng, STAGES, n),
+            "type": _choice(rng, APP_TYPES, n),
+            "result_code": _choice(rng, RESULT_CODES, n),
+            "attending": "",
+            "waitlisted": rng.choice(["1", "0", "", ""], n),
+            "deferred": rng.choice(["1", "0", "", "", "", ""], n),
+            "comments": np.where(rng.random(n) < 0.01, "Posse", ""),
+            "NCES": colleges["UNITID"].values[college].astype(object),
+        }
+    )
+    apps = apps.drop_duplicates(["hs_student_id", "NCES"])
+    # Each student attends at most one of their acceptances
+    accepted = apps[apps["result_code"] == "accepted"]
+    choice = accepted.sample(frac=1.0, random_state=rng.integers(1 << 31))
+    choice = choice.drop_duplicates("hs_student_id").index
+    apps.loc[choice[: len(choice) // 2], "attending"] = "yes"
+    # A few programs that aren't colleges come through without an NCES ID
+    apps.loc[rng.random(len(apps)) < 0.005, "NCES"] = ""
+    return apps
+
+
+def make_live_tables(rng, roster, apps, colleges, config):
+    """Returns the live_efc, live_award and live_decision tables (as read
+    from the Google Docs) for the whole roster with a Campus column"""
+    efc = roster.set_index("StudentID")[["Campus", "LastFirst", "EFC"]].copy()
+    for field in config["live_efc_fields"][3:]:
+        efc[field] = ""
+    efc["Acceptances"] = 0
+
+    admitted = ["accepted", "cond. accept", "summer admit"]
+    award = apps[apps["result_code"].isin(admitted)]
+    living = colleges.set_index("UNITID")["Living"]
+    home_away = award["NCES"].map(living).fillna("Campus").values
+    n = len(award)
+    has_award = rng.random(n) < 0.5
+
+    def money(low, high):
+        return np.where(has_award, rng.integers(low, high, n), np.nan)
+
+    award = pd.DataFrame(
+        {
+            "SID": award["hs_student_id"].values,
+            "NCESid": award["NCES"].values,
+            "Home/Away": np.where(home_away == "Both", "Home", home_away),
+            "Campus": award["Campus"].values,
+            "Student": roster.set_index("StudentID")["LastFirst"]
+            .reindex(award["hs_student_id"])
+            .values,
+            "College/University": award["collegename"].values,
+            "Result (from Naviance)": np.where(
+                award["attending"] == "yes", "CHOICE!", "Accepted!"
+            ),
+            "Tuition & Fees (including insurance if req.)": money(4000, 60000),
+            "Room & board (if not living at home)": money(0, 16000),
+            "College grants & scholarships": money(0, 50000),
+            "Government grants (Pell/SEOG/MAP)": money(0, 12000),
+            "Student Loans offered (include all non-parent)": money(0, 7500),
+            "Work Study (enter for comparison if desired)": money(0, 3000),
+            "Unique": 1,
+            "Award": np.where(has_award, 1, 0),
+        }
+    )
+    # The doc's formula columns (only on the campus docs, not the All file)
+    net_price = (
+        award["Tuition & Fees (including insurance if req.)"]
+        + award["Room & board (if not living at home)"]
+        - award["College grants & scholarships"]
+        - award["Government grants (Pell/SEOG/MAP)"]
+    )
+    out_of_pocket = net_price - award["Student Loans offered (include all non-parent)"]
+    student_efc = pd.to_numeric(efc["EFC"], errors="coerce").reindex(award["SID"])
+    award["Net Price (before Loans) <CALCULATED>"] = net_price
+    award["Out of Pocket Cost (Direct Cost-Grants-Loans) <CALCULATED>"] = out_of_pocket
+    award["Your EFC <DRAWN FROM OTHER TAB>"] = student_efc.values
+    award["Unmet need <CALCULATED>"] = out_of_pocket - student_efc.values
+
+    choice = award[award["Result (from Naviance)"] == "CHOICE!"]
+    choice = choice.drop_duplicates("SID").set_index("SID")
+    decision = efc[["Campus", "LastFirst"]].copy()
+    for field in config["live_decision_fields"][2:]:
+        decision[field] = ""
+    college_choice = config["live_decision_fields"][4]
+    decision[college_choice] = choice["College/University"].reindex(decision.index)
+    decision["PGR for choice school"] = np.where(
+        decision[college_choice].notna(), rng.random(len(decision)).round(2), "TBD"
+    )
+    decision["startRow"] = np.arange(len(decision)) * 4 + 2
+    decision["endRow"] = decision["startRow"] + 3
+    return efc, award, decision
+
+
+def make_network(folder, students_per_campus=STUDENTS_PER_CAMPUS, campuses=None,
+                 seed=0, settings_folder="settings", fonts_folder="fonts"):
+    """
+    Writes a synthetic network to folder: students_per_campus students at
+    each campus (the settings campus_list if campuses is None; otherwise
+    the copied settings file is rewritten to use campuses). Returns a
+    dict describing what was generated (also saved as network.json)
+    """
+    rng = np.random.default_rng(seed)
+    if os.path.isdir(folder):
+        shutil.rmtree(folder)
+    shutil.copytree(settings_folder, os.path.join(folder, "settings"))
+    shutil.copytree(fonts_folder, os.path.join(folder, "fonts"))
+
+    settings_file = os.path.join(folder, "settings", "settings.yml")
+    cfg = filework.read_settings(settings_file)
+    if campuses:
+        cfg["campus_list"] = list(campuses)
+        cfg["summary_settings"]["campuses"] = list(campuses)
+        with open(settings_file, "w") as f:
+            yaml.dump(cfg, f, sort_keys=False)
+    config = filework.build_config(cfg, "All")
+    campuses = config["campus_list"]
+
+    colleges = pd.read_csv(
+        os.path.join(folder, config["colleges"]), encoding="cp1252", na_values=["N/A"]
+    )
+    roster = make_roster(rng, campuses, students_per_campus)
+    apps = make_applications(rng, roster, colleges)
+    efc, award, decision = make_live_tables(rng, roster, apps, colleges, config)
+
+    roster.to_csv(
+        os.path.join(folder, config["current_roster"]), index=False, encoding="cp1252"
+    )
+    apps.to_csv(
+        os.path.join(folder, config["current_applications"]),
+        index=False,
+        encoding="cp1252",
+    )
+    bumps = apps[apps["NCES"] != ""]
+    bumps = bumps.sample(min(50, len(bumps)), random_state=seed)
+    pd.DataFrame(
+        {"SID": bumps["hs_student_id"].values, "NCESid": bumps["NCES"].values}
+    ).to_csv(os.path.join(folder, config["bump_list"]), index=False)
+
+    # Live files are written from inside the folder because the settings
+    # paths are relative
+    cwd = os.getcwd()
+    os.chdir(folder)
+    try:
+        for name in ["live_backup_folder", "live_archive_folder", "report_folder"]:
+            os.makedirs(config[name], exist_ok=True)
+        for campus in campuses:
+            # Per-campus docs have the campus's award columns and no Campus
+            # column
+            award_fields = filework.build_config(cfg, campus)["award_fields"]
+            live = {
+                "live_efc": efc[efc["Campus"] == campus].drop(columns="Campus"),
+                "live_award": award[award["Campus"] == campus].reindex(
+                    columns=award_fields
+                ),
+                "live_decision": decision[decision["Campus"] == campus].drop(
+                    columns="Campus"
+                ),
+            }
+            filework.save_live_dfs(live, campus, config, False)
+        live = {
+            "live_efc": efc[config["live_efc_fields"]],
+            "live_award": award[config["live_award_fields"]],
+            "live_decision": decision[config["live_decision_fields"]],
+        }
+        filework.save_live_dfs(live, "All", config, False)
+    finally:
+        os.chdir(cwd)
+
+    network = {
+        "seed": seed,
+        "campuses": list(campuses),
+        "students_per_campus": students_per_campus,
+        "students": len(roster),
+        "applications": len(apps),
+        "awards": len(award),
+    }
+    with open(os.path.join(folder, "network.json"), "w") as f:
+        json.dump(network, f, indent=1)
+    return network
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic network")
+    parser.add_argument(
+        "-o",
+        "--output",
+        dest="folder",
+        action="store",
+        help="Folder to write the network to (replaced if it exists)",
+        default=os.path.join("benchmarks", "data", "1x"),
+    )
+    parser.add_argument(
+        "-n",
+        "--students",
+        dest="students",
+        action="store",
+        type=int,
+        help="Number of students per campus",
+        default=STUDENTS_PER_CAMPUS,
+    )
+    parser.add_argument(
+        "-c",
+        "--campuses",
+        dest="campuses",
+        action="store",
+        type=int,
+        help="Number of campuses (default is the settings campus_list)",
+        default=0,
+    )
+    parser.add_argument(
+        "--seed",
+        dest="seed",
+        action="store",
+        type=int,
+        help="Random seed",
+        default=0,
+    )
+    args = parser.parse_args()
+
+    campuses = None
+    if args.campuses:
+        campuses = ["Campus{:02d}".format(i) for i in range(args.campuses)]
+    print(make_network(args.folder, args.students, campuses, args.seed))
@@ -9,34 +9,62 @@ import pandas as pd
 
 
 # The following functions are all used to add calculations to the main table
-def _get_final_result(x):
-    """Apply function for providing a final status of the application"""
-    result_code, attending, waitlisted, deferred, stage, app_type = x
-    if result_code == "denied":
-        return "Denied"
-    elif result_code in ["accepted", "cond. accept", "summer admit"]:
-        if attending == "yes":
-            return "CHOICE!"
-        else:
-            return "Accepted!"
-    elif result_code == "guar. transfer":
-        return "Guar. Xfer"
-    elif (waitlisted == 1) | (waitlisted == "1"):
-        return "Waitlist"
-    elif (deferred == 1) | (deferred == "1"):
-        return "Deferred"
-    elif stage == "pending":
-        return "Pending"
-    elif stage in [
-        "initial materials submitted",
-        "mid-year submitted",
-        "final submitted",
-    ]:
-        return "Submitted"
-    elif app_type == "interest":
-        return "Interest"
-    else:
-        return "?"
+ACCEPTED_CODES = ["accepted", "cond. accept", "summer admit"]
+SUBMITTED_STAGES = [
+    "initial materials submitted",
+    "mid-year submitted",
+    "final submitted",
+]
+FINAL_RESULTS = [
+    "Denied",
+    "CHOICE!",
+    "Accepted!",
+    "Guar. Xfer",
+    "Waitlist",
+    "Deferred",
+    "Pending",
+    "Submitted",
+    "Interest",
+    "?",
+]
+
+
+def _in_values(column, values):
+    """column.isin(values) as an array. For a categorical column the test is
+    done once per category and looked up by code"""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        in_categories = np.append(column.cat.categories.isin(values), False)
+        return in_categories[column.cat.codes.values]  # code -1 is nan
+    return column.isin(values).values
+
+
+def _is_one(column):
+    """True where the column holds 1 or "1" (waitlisted and deferred come
+    through as either depending on the rest of the column)"""
+    if pd.api.types.is_numeric_dtype(column.dtype):
+        return (column == 1).values
+    values = np.asarray(column, dtype=object)
+    return (values == 1) | (values == "1")
+
+
+def _get_final_result(df):
+    """Returns a final status of each application as a categorical with the
+    FINAL_RESULTS categories (the first status that applies, in that order)"""
+    result_code = df["result_code"]
+    accepted = _in_values(result_code, ACCEPTED_CODES)
+    conditions = [
+        _in_values(result_code, ["denied"]),
+        accepted & _in_values(df["attending"], ["yes"]),
+        accepted,
+        _in_values(result_code, ["guar. transfer"]),
+        _is_one(df["waitlisted"]),
+        _is_one(df["deferred"]),
+        _in_values(df["stage"], ["pending"]),
+        _in_values(df["stage"], SUBMITTED_STAGES),
+        _in_values(df["type"], ["interest"]),
+    ]
+    codes = np.select(conditions, list(range(len(conditions))), len(FINAL_RESULTS) - 1)
+    return pd.Categorical.from_codes(codes, FINAL_RESULTS)
 
 
 def _make_barrons_translation(x):
@@ -60,68 +88,160 @@ def _make_barrons_translation(x):
         return "?"
 
 
-def _get_act_translation(x, lookup_df):
-    """Apply function for calculating equivalent SAT for ACT scores.
-    Lookup table has index of ACT with value of SAT"""
-    act = x
-    if np.isreal(act):
-        if act in lookup_df.index:  # it's an ACT value in the table
-            return lookup_df.loc[act, "SAT"]
-    return np.nan  # default if not in table or not a number
+def _is_real(values):
+    """Array version of np.isreal for the cells of a column. The roster
+    readers keep strings (including blanks) they can't convert, so in an
+    object column those are the values that aren't real (nan is real)"""
+    values = np.asarray(values)
+    if values.dtype != object:
+        return np.isreal(values)
+    return np.fromiter(
+        (
+            isinstance(x, (int, float)) or (not isinstance(x, str) and np.isreal(x))
+            for x in values
+        ),
+        dtype=bool,
+        count=len(values),
+    )
 
 
-def _get_sat_guess(x):
-    """Returns a GPA guess based on regression constants from the
-    prior year. nan if GPA isn't a number"""
-    gpa = x
-    if np.isreal(gpa):
-        guess = 427.913068576 + 185.298880075 * gpa
-        return np.round(guess / 10.0) * 10.0
-    else:
-        return np.nan
-
-
-def _pick_sat_for_use(x):
-    """ Returns the SAT we'll use in practice"""
-    sat_guess, interim, actual_sat = x
-    if np.isreal(actual_sat):
-        return actual_sat
-    elif np.isreal(interim):
-        return interim
-    elif np.isreal(sat_guess):
-        return sat_guess
-    else:
-        return np.nan
+def _is_int(values):
+    """True for the cells of a column that hold integers"""
+    values = np.asarray(values)
+    if values.dtype != object:
+        return np.full(len(values), np.issubdtype(values.dtype, np.integer))
+    return np.fromiter(
+        (isinstance(x, (int, np.integer)) for x in values),
+        dtype=bool,
+        count=len(values),
+    )
 
 
-def _get_sat_max(x):
-    """Returns the max of two values if both are numbers, otherwise
-    returns the numeric one or nan if neither is numeric"""
-    sat, act_in_sat = x
-    if np.isreal(sat):
-        if np.isreal(act_in_sat):
-            return max(sat, act_in_sat)
-        else:
-            return sat
-    else:
-        if np.isreal(act_in_sat):
-            return act_in_sat
-        else:
-            return np.nan
+def _to_float(values, real):
+    """Returns the column as floats with nan where it isn't real"""
+    values = np.asarray(values)
+    if values.dtype != object:
+        return values.astype(float)
+    return np.where(real, values, np.nan).astype(float)
 
 
-def _get_strategies(x, lookup_df):
-    """Apply function for calculating strategies based on gpa and sat using the
-    lookup table (mirrors Excel equation for looking up strategy"""
-    gpa, sat = x
-    sat = sat if np.isreal(sat) else 710
-    if np.isreal(gpa):
-        lookup = "{:.1f}:{:.0f}".format(
-            max(np.floor(gpa * 10) / 10, 1.5), max(sat, 710)
-        )
-        return lookup_df["Strategy"].get(lookup, np.nan)
-    else:
-        return np.nan
+def _format_values(values, fmt):
+    """Returns fmt.format(x) for each of the values as an object array,
+    formatting each distinct value once"""
+    uniques, inverse = np.unique(values, return_inverse=True)
+    labels = np.array([fmt.format(x) for x in uniques], dtype=object)
+    return labels[inverse.reshape(-1)]
+
+
+def _lookup(table, keys):
+    """Returns table.get(key, np.nan) for each of the keys as an array, keeping
+    the table's dtype if every key is found"""
+    positions = table.index.get_indexer(keys)
+    found = positions >= 0
+    if found.all():
+        return table.values[positions]
+    values = table.values[np.where(found, positions, 0)].astype(float)
+    values[~found] = np.nan
+    return values
+
+
+def _get_act_translation(act, lookup_df):
+    """Returns the equivalent SAT for ACT scores. Lookup table has index of ACT
+    with value of SAT; nan if not in the table or not a number"""
+    real = _is_real(act)
+    return _lookup(lookup_df["SAT"], np.where(real, _to_float(act, real), np.nan))
+
+
+def _get_sat_guess(gpa):
+    """Returns a SAT guess based on regression constants from the
+    prior year. nan if GPA isn't a number"""
+    real = _is_real(gpa)
+    guess = 427.913068576 + 185.298880075 * _to_float(gpa, real)
+    return np.where(real, np.round(guess / 10.0) * 10.0, np.nan)
+
+
+def _pick_sat_for_use(df):
+    """Returns the SAT we'll use in practice: the actual SAT if it's a number,
+    then the interim one, then the guess"""
+    sat_real = _is_real(df["SAT"])
+    interim_real = _is_real(df["InterimSAT"])
+    used = np.where(
+        sat_real,
+        _to_float(df["SAT"], sat_real),
+        np.where(
+            interim_real,
+            _to_float(df["InterimSAT"], interim_real),
+            df["local_sat_guess"].values,
+        ),
+    )
+    picked_int = _picked_int(df)
+    if picked_int is not None and picked_int.all():
+        return used.astype(np.int64)
+    return used
+
+
+def _picked_int(df):
+    """Returns which students' picked SAT is an int, or None if the columns
+    are all numeric. Row-wise, numeric columns came through as floats but
+    the values of object columns kept their type, so all whole numbers gave
+    an int column"""
+    columns = df[["local_sat_guess", "InterimSAT", "SAT"]]
+    if all(pd.api.types.is_numeric_dtype(t) for t in columns.dtypes):
+        return None
+    return np.where(
+        _is_real(df["SAT"]),
+        _is_int(df["SAT"]),
+        _is_real(df["InterimSAT"]) & _is_int(df["InterimSAT"]),
+    )
+
+
+def _get_sat_max(sat, act_in_sat):
+    """Returns the max of the two (the SAT if either is nan, as max() did)"""
+    return np.where(act_in_sat > sat, act_in_sat, sat)
+
+
+def compile_strategy_grid(strat_df):
+    """Compiles the strategy lookup table (indexed like "4.3:710") to a dict
+    with a 2-D "grid" of strategies indexed by GPA in tenths and SAT, both
+    offset by "start"; -1 where the table has no strategy"""
+    keys = strat_df.index.to_series().str.split(":", expand=True)
+    gpa = np.round(pd.to_numeric(keys[0], errors="coerce").values * 10)
+    sat = np.round(pd.to_numeric(keys[1], errors="coerce").values)
+    strategy = strat_df["Strategy"].values
+    # Only keys that the "{:.1f}:{:.0f}" lookup could produce are kept
+    usable = np.isfinite(gpa) & np.isfinite(sat) & pd.notnull(strategy)
+    usable[usable] = (
+        _format_values(gpa[usable] / 10, "{:.1f}")
+        + ":"
+        + _format_values(sat[usable], "{:.0f}")
+    ) == strat_df.index.values[usable]
+    gpa, sat = gpa[usable].astype(np.int64), sat[usable].astype(np.int64)
+    start = np.array([gpa.min(), sat.min()])
+    grid = np.full((gpa.max() - start[0] + 1, sat.max() - start[1] + 1), -1)
+    grid[gpa - start[0], sat - start[1]] = strategy[usable].astype(np.int64)
+    return {"grid": grid, "start": start}
+
+
+def _get_strategies(gpa, sat, strat_grid):
+    """Returns strategies based on gpa and sat using the compiled lookup table
+    (mirrors Excel equation for looking up strategy: GPA floored to a tenth
+    and at least 1.5, SAT at least 710)"""
+    real = _is_real(gpa)
+    gpa_key = np.maximum(np.floor(_to_float(gpa, real) * 10), 15)
+    sat_key = np.round(np.maximum(np.asarray(sat, dtype=float), 710))
+    grid = strat_grid["grid"]
+    rows = np.where(real & np.isfinite(gpa_key), gpa_key, -1) - strat_grid["start"][0]
+    columns = np.where(np.isfinite(sat_key), sat_key, -1) - strat_grid["start"][1]
+    inside = (rows >= 0) & (rows < grid.shape[0])
+    inside &= (columns >= 0) & (columns < grid.shape[1])
+    strategies = np.full(len(rows), -1)
+    strategies[inside] = grid[
+        rows[inside].astype(np.int64), columns[inside].astype(np.int64)
+    ]
+    found = strategies >= 0
+    if found.all():
+        return strategies
+    return np.where(found, strategies, np.nan)
 
 
 def _safe2int(x):
@@ -131,70 +251,245 @@ def _safe2int(x):
         return x
 
 
-def _get_gr_target(x, lookup_strat, goal_type):
-    """Apply function to get the target or ideal grad rate for student"""
-    strat, gpa, efc, race = x
+GROUPS = ["minus1_", "W/A_", "AA/H_"]
+GOAL_TYPES = ["target", "ideal"]
+
+
+def _get_gr_targets(strat, gpa, efc, race, lookup_strat):
+    """Returns the target and ideal grad rates for each student as the two
+    columns of an array"""
     # 2 or 3 strategies are split by being above/below 3.0 GPA line
     # First we identify those and then adjust the lookup index accordingly
     special_strats = [int(x[0]) for x in lookup_strat.index if x[-1] == "+"]
-    if np.isreal(gpa) and np.isreal(strat):
-        # First define the row in the lookup table
-        strat_str = "{:.0f}".format(strat)
-        if strat in special_strats:
-            lookup = strat_str + "+" if gpa >= 3.0 else strat_str + "<"
-        else:
-            lookup = strat_str
+    real = _is_real(gpa)
+    gpa = _to_float(gpa, real)
 
-        # Then define the column in the lookup table
-        if efc == -1:
-            column = "minus1_" + goal_type
-        elif race in ["W", "A", "P"]:
-            column = "W/A_" + goal_type
-        else:
-            column = "AA/H_" + goal_type
-        return lookup_strat[column].get(lookup, np.nan)
-    else:
-        return np.nan
+    # First define the row in the lookup table
+    split = np.where(gpa >= 3.0, "+", "<").astype(object)
+    lookup = _format_values(strat, "{:.0f}") + np.where(
+        np.isin(strat, special_strats), split, ""
+    )
+    rows = lookup_strat.index.get_indexer(lookup)
 
+    # Then define the column group in the lookup table (an index to GROUPS)
+    white_asian = np.isin(np.asarray(race, dtype=object), ["W", "A", "P"])
+    group = np.where(
+        np.asarray(efc, dtype=object) == -1, 0, np.where(white_asian, 1, 2)
+    )
+
+    # One gather from the table reshaped to (strategy row, group, goal type),
+    # with an extra all-nan row for students without a match
+    columns = [prefix + goal_type for prefix in GROUPS for goal_type in GOAL_TYPES]
+    table = lookup_strat[columns].to_numpy(dtype=float)
+    table = np.vstack([table, np.full(len(columns), np.nan)])
+    table = table.reshape(-1, len(GROUPS), len(GOAL_TYPES))
+    rows[~real] = -1
+    return table[rows, group]
+
+
+def _make_final_gr(race, sixyrgr, sixyrgraah, comments):
+    """Returns the graduation rates to use for each application"""
+    first_gr = np.where(
+        np.isin(race, ["B", "H", "M", "I"]), sixyrgraah, sixyrgr
+    ).astype(float)
+    posse_gr = np.where(first_gr < 0.7, first_gr + 0.15, 1.0 - (1.0 - first_gr) / 2)
+    return np.where(np.asarray(comments, dtype=object) == "Posse", posse_gr, first_gr)
+
+
+def _left_join(keys, table, fields):
+    """Looks up the keys in the table's index, returning a DataFrame aligned
+    with the keys with a column for each (dest, source, default) in fields.
+    Keys not in the table get the default (as with Series.get). Categorical
+    table columns come back as plain values"""
+    if not table.index.is_unique:
+        table = table[~table.index.duplicated()]
+    positions = table.index.get_indexer(keys)
+    found = positions >= 0
+    take = np.where(found, positions, 0)
+    joined = {}
+    for dest, source, default in fields:
+        column = pd.Series(np.asarray(table[source])[take], index=keys.index)
+        if not found.all():
+            column = column.where(found, default)
+        joined[dest] = column.infer_objects()
+    return pd.DataFrame(joined, index=keys.index)
+
+
+def _award_rows(app_df, final_result, ros_df, college_df):
+    """Returns the applications going in the doc (one row each; home/away
+    rows are doubled later) with the roster and college lookups added"""
+    award_df = app_df.copy()
+    award_df["final_result"] = final_result
+
+    # Do all of the lookups from the roster table:
+    roster_join = _left_join(
+        award_df["hs_student_id"],
+        ros_df,
+        [
+            ("lf", "LastFirst", "StudentMissing"),
+            ("tgr", "Target Grad Rate", np.nan),
+            ("igr", "Ideal Grad Rate", np.nan),
+            ("race", "Race/ Eth", "N/A"),
+        ],
+    )
+
+    # Now do all lookups from the college table:
+    college_join = _left_join(
+        award_df["NCES"],
+        college_df,
+        [
+            ("cname", "INSTNM", "NotAvail"),
+            ("barrons", "SimpleBarrons", "N/A"),
+            ("local", "Living", "Campus"),
+            ("sixyrgr", "Adj6yrGrad_All", np.nan),
+            ("sixyrgraah", "Adj6yrGrad_AA_Hisp", np.nan),
+        ],
+    )
+    award_df = award_df.assign(**roster_join, **college_join)
+
+    # Cleanup from college table for missing values
+    award_df["cname"] = award_df["cname"].where(
+        award_df["cname"] != "NotAvail", award_df["collegename"]
+    )
+    barrons = award_df["barrons"].unique()
+    award_df["barrons"] = award_df["barrons"].map(
+        dict(zip(barrons, map(_make_barrons_translation, barrons)))
+    )
+    award_df["sixyrfinal"] = _make_final_gr(
+        award_df["race"].values,
+        award_df["sixyrgr"].values,
+        award_df["sixyrgraah"].values,
+        award_df["comments"].values,
+    )
+    return award_df
+
+
+def _award_column(award_df, field, rows, expanded, source):
+    """Returns the values of an award tab field for the rows (positions in
+    award_df, 'Both' colleges twice), from the expanded home/away columns or
+    the award_df column it's renamed from"""
+    if field in expanded:
+        return expanded[field]
+    return award_df[source.get(field, field)].values[rows]
+
+
+# Columns add_strat_and_grs adds to the roster
+ENRICHED_COLUMNS = [
+    "local_act_in_sat",
+    "local_sat_guess",
+    "local_sat_used",
+    "local_sat_max",
+    "Stra-tegy",
+    "Target Grad Rate",
+    "Ideal Grad Rate",
+]
+
+
+def _add_empty_columns(df):
+    """Adds the columns of add_strat_and_grs to an empty roster (the same
+    columns the row-wise applies gave)"""
+    df["local_act_in_sat"] = df["ACT"].copy()
+    df["local_sat_guess"] = df["GPA"].copy()
+    for column in ENRICHED_COLUMNS[2:]:
+        df[column] = pd.Series(dtype=float, index=df.index)
+    return df
+
+
+def _campus_dtypes(df, rows, acttosat_df, picked_int):
+    """Returns the dtypes add_strat_and_grs would have given the columns that
+    are only ints if every student is (see _lookup, _get_strategies and
+    _pick_sat_for_use), for the rows of the network-wide result df"""
+    dtypes = {}
+    whole = df.iloc[rows]
+    act_dtype = np.asarray(acttosat_df["SAT"]).dtype
+    if not whole["local_act_in_sat"].isna().any():
+        dtypes["local_act_in_sat"] = act_dtype
+    if not whole["Stra-tegy"].isna().any():
+        dtypes["Stra-tegy"] = np.dtype(np.int64)
+    if picked_int is not None and picked_int[rows].all():
+        dtypes["local_sat_used"] = np.dtype(np.int64)
+    dtypes["local_sat_max"] = np.result_type(
+        dtypes.get("local_act_in_sat", whole["local_act_in_sat"].dtype),
+        dtypes.get("local_sat_used", whole["local_sat_used"].dtype),
+    )
+    return {
+        column: dtype for column, dtype in dtypes.items() if dtype != df[column].dtype
+    }
 
-def _make_final_gr(x):
-    """Apply function to do graduation rates"""
-    race, sixyrgr, sixyrgraah, comments = x
-    first_gr = sixyrgraah if race in ["B", "H", "M", "I"] else sixyrgr
-    if comments == "Posse":
-        return (first_gr + 0.15) if first_gr < 0.7 else (1.0 - (1.0 - first_gr) / 2)
-    else:
-        return first_gr
+
+def split_by_campus(df, acttosat_df):
+    """
+    Takes the roster after add_strat_and_grs(..., "All") and returns what
+    campus_roster needs to hand out each campus's part of it: the roster
+    ("All"), the same rows stably sorted by campus ("by_campus"), each
+    campus's (start, stop) positions in that ("ranges") and the columns
+    whose dtype differs for the campus ("dtypes")
+    """
+    codes, campuses = pd.factorize(np.asarray(df["Campus"], dtype=object))
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    starts = np.searchsorted(sorted_codes, np.arange(len(campuses)), side="left")
+    stops = np.searchsorted(sorted_codes, np.arange(len(campuses)), side="right")
+    by_campus = df.take(order)
+    picked_int = _picked_int(by_campus)
+    ranges, dtypes = {}, {}
+    for campus, start, stop in zip(campuses, starts, stops):
+        ranges[campus] = (start, stop)
+        dtypes[campus] = _campus_dtypes(
+            by_campus, slice(start, stop), acttosat_df, picked_int
+        )
+    return {"All": df, "by_campus": by_campus, "ranges": ranges, "dtypes": dtypes}
+
+
+def campus_roster(split, campus):
+    """Returns the campus's part of a split_by_campus result, the same as
+    add_strat_and_grs(..., campus) gives. It's a slice of the sorted roster
+    rather than a copy (only columns with a different dtype are new)"""
+    if campus == "All":
+        return split["All"]
+    if campus not in split["ranges"]:
+        empty = split["by_campus"].iloc[:0].drop(columns=ENRICHED_COLUMNS)
+        return _add_empty_columns(empty.copy())
+    start, stop = split["ranges"][campus]
+    df = split["by_campus"].iloc[start:stop]
+    if split["dtypes"][campus]:
+        df = df.astype(split["dtypes"][campus], copy=False)
+    return df
 
 
 # Finally, the main function that calls these
 
 
-def add_strat_and_grs(df, strat_df, target_df, acttosat_df, campus, debug):
+def add_strat_and_grs(df, strat_grid, target_df, acttosat_df, campus, debug):
     """
     Adds Strategy and Target/Ideal grad rate numbers to the roster table
     """
     df = df.copy()
     if campus != "All":
-        df = df[df["Campus"] == campus]
-    df["local_act_in_sat"] = df["ACT"].apply(_get_act_translation, args=(acttosat_df,))
-    df["local_sat_guess"] = df["GPA"].apply(_get_sat_guess)
-    df["local_sat_used"] = df[["local_sat_guess", "InterimSAT", "SAT"]].apply(
-        _pick_sat_for_use, axis=1
-    )
-    
-    df["local_sat_max"] = df[["local_sat_used", "local_act_in_sat"]].apply(
-        _get_sat_max, axis=1
-    )
-    df["Stra-tegy"] = df[["GPA", "local_sat_max"]].apply(
-        _get_strategies, axis=1, args=(strat_df,)
+        df = df[df["Campus"] == campus].copy()
+    if df.empty:
+        if debug:
+            print("Total roster length of 0.")
+        return _add_empty_columns(df)
+
+    df["local_act_in_sat"] = _get_act_translation(df["ACT"].values, acttosat_df)
+    df["local_sat_guess"] = _get_sat_guess(df["GPA"].values)
+    df["local_sat_used"] = _pick_sat_for_use(df)
+    df["local_sat_max"] = _get_sat_max(
+        df["local_sat_used"].values, df["local_act_in_sat"].values
     )
-    df["Target Grad Rate"] = df[["Stra-tegy", "GPA", "EFC", "Race/ Eth"]].apply(
-        _get_gr_target, axis=1, args=(target_df, "target")
+    df["Stra-tegy"] = _get_strategies(
+        df["GPA"].values, df["local_sat_max"].values, strat_grid
     )
-    df["Ideal Grad Rate"] = df[["Stra-tegy", "GPA", "EFC", "Race/ Eth"]].apply(
-        _get_gr_target, axis=1, args=(target_df, "ideal")
+    grad_rates = _get_gr_targets(
+        df["Stra-tegy"].values,
+        df["GPA"].values,
+        df["EFC"].values,
+        df["Race/ Eth"].values,
+        target_df,
     )
+    df["Target Grad Rate"] = grad_rates[:, 0]
+    df["Ideal Grad Rate"] = grad_rates[:, 1]
 
     if debug:
         print("Total roster length of {}.".format(len(df)))
@@ -235,78 +530,13 @@ def make_clean_gdocs(dfs, config, debug):
     # #####################################################
     # Now do the more complicated awards tab
     current_students = list(efc_df.index)
-    award_df = app_df[app_df["hs_student_id"].isin(current_students)].copy()
-
-    # Do all of the lookups from the roster table:
-    for dest, source, default in (
-        ("lf", "LastFirst", "StudentMissing"),
-        ("tgr", "Target Grad Rate", np.nan),
-        ("igr", "Ideal Grad Rate", np.nan),
-        ("race", "Race/ Eth", "N/A"),
-    ):
-        award_df[dest] = award_df["hs_student_id"].apply(
-            lambda x: ros_df[source].get(x, default)
-        )
-
-    # Now do all lookups from the college table:
-    for dest, source, default in (
-        ("cname", "INSTNM", "NotAvail"),
-        ("barrons", "SimpleBarrons", "N/A"),
-        ("local", "Living", "Campus"),
-        ("sixyrgr", "Adj6yrGrad_All", np.nan),
-        ("sixyrgraah", "Adj6yrGrad_AA_Hisp", np.nan),
-    ):
-        award_df[dest] = award_df["NCES"].apply(
-            lambda x: college_df[source].get(x, default)
-        )
+    final_result = pd.Series(_get_final_result(app_df), index=app_df.index)
 
-    # Cleanup from college table for missing values
-    award_df["cname"] = award_df[["cname", "collegename"]].apply(
-        lambda x: x[1] if x[0] == "NotAvail" else x[0], axis=1
-    )
-    award_df["barrons"] = award_df["barrons"].apply(_make_barrons_translation)
-    award_df["sixyrfinal"] = award_df[
-        ["race", "sixyrgr", "sixyrgraah", "comments"]
-    ].apply(_make_final_gr, axis=1)
-
-    # Other interpreted/calculated values:
-    award_df["final_result"] = award_df[
-        ["result_code", "attending", "waitlisted", "deferred", "stage", "type"]
-    ].apply(_get_final_result, axis=1)
-
-    # Calculated or blank columns (we'll push the calculations with AppsScript)
-    for f in [
-        "Award Receiv- ed?",
-        "Tuition & Fees (including insurance if req.)",
-        "Room & board (if not living at home)",
-        "College grants & scholarships",
-        "Government grants (Pell/SEOG/MAP)",
-        "Net Price (before Loans) <CALCULATED>",
-        "Student Loans offered (include all non-parent)",
-        "Out of Pocket Cost (Direct Cost-Grants-Loans) <CALCULATED>",
-        "Your EFC <DRAWN FROM OTHER TAB>",
-        "Unmet need <CALCULATED>",
-        "Work Study (enter for comparison if desired)",
-        "Award",
-    ]:
-        award_df[f] = ""
-
-    # Still need to double up home colleges for home/away rows
-    both_rows = award_df[award_df["local"] == "Both"].copy()
-    # 'Both' rows become 'Home' here and the replicants (above) will be Away
-    award_df["cname"] = award_df[["cname", "local"]].apply(
-        lambda x: x[0] + ("" if x[1] == "Campus" else "--At Home"), axis=1
-    )
-    award_df["local"] = award_df["local"].apply(lambda x: "Home" if x == "Both" else x)
-    award_df["Unique"] = 1
-    # these are the duplicate rows
-    both_rows["local"] = "Campus"
-    both_rows["Unique"] = 0
-    both_rows["cname"] = both_rows["cname"] + "--On Campus"
-    award_df = pd.concat([award_df, both_rows])
-
-    # Keep different statuses based on config file
-    award_df = award_df[award_df["final_result"].isin(include_statuses)]
+    # Keep different statuses based on config file (up front, so only rows
+    # going in the doc are copied and looked up)
+    keep = app_df["hs_student_id"].isin(current_students).values
+    keep &= _in_values(final_result, include_statuses)
+    award_df = _award_rows(app_df[keep], final_result[keep], ros_df, college_df)
 
     # Rename labels to match what will be in the doc
     mapper = {
@@ -329,11 +559,40 @@ def make_clean_gdocs(dfs, config, debug):
         "NCES": "NCESid",
         "local": "Home/Away",
     }
-    use_mapper = {key: value for key, value in mapper.items() if value in award_fields}
-    award_df.rename(columns=use_mapper, inplace=True)
+    source = {value: key for key, value in mapper.items()}
+
+    # Still need to double up home colleges for home/away rows: every row is
+    # taken once and then the 'Both' rows again, in one pass per column
+    local = award_df["local"].values
+    rows = np.concatenate([np.arange(len(award_df)), np.flatnonzero(local == "Both")])
+    replicant = np.arange(len(rows)) >= len(award_df)
+    local = local[rows]
+    # 'Both' rows become 'Home' here and the replicants will be Away
+    suffix = np.where(local == "Campus", "", "--At Home").astype(object)
+    suffix[replicant] = "--On Campus"
+    home_away = np.where(local == "Both", "Home", local)
+    home_away[replicant] = "Campus"
+    expanded = {
+        "College/University": award_df["cname"].values[rows] + suffix,
+        "Home/Away": home_away,
+        "Unique": np.where(replicant, 0, 1),
+    }
 
-    # Final reduce the table to just what's going in the Google Doc
-    award_df = award_df[award_fields]
+    # Calculated or blank columns (we'll push the calculations with AppsScript)
+    blank_fields = [
+        "Award Receiv- ed?",
+        "Tuition & Fees (including insurance if req.)",
+        "Room & board (if not living at home)",
+        "College grants & scholarships",
+        "Government grants (Pell/SEOG/MAP)",
+        "Net Price (before Loans) <CALCULATED>",
+        "Student Loans offered (include all non-parent)",
+        "Out of Pocket Cost (Direct Cost-Grants-Loans) <CALCULATED>",
+        "Your EFC <DRAWN FROM OTHER TAB>",
+        "Unmet need <CALCULATED>",
+        "Work Study (enter for comparison if desired)",
+        "Award",
+    ]
 
     # Sort the table based on config file
     # award_sort is a list with the right fields
@@ -342,7 +601,40 @@ def make_clean_gdocs(dfs, config, debug):
     else:
         sort_order = [True, False, True]
 
-    award_df.sort_values(by=award_sort, ascending=sort_order, inplace=True)
+    # The rows are put in order before the table is built so it isn't copied
+    # again to sort it (the sort is the same one sort_values does on the table)
+    sort_df = pd.DataFrame(
+        {
+            field: _award_column(award_df, field, rows, expanded, source)
+            for field in award_sort
+        }
+    )
+    order = sort_df.sort_values(by=award_sort, ascending=sort_order).index.values
+    rows = rows[order]
+    expanded = {field: values[order] for field, values in expanded.items()}
+
+    # Final reduce the table to just what's going in the Google Doc. The text
+    # columns are written straight into a single block and the others added
+    # to it, so building the table doesn't copy them again
+    text_fields = [
+        field
+        for field in award_fields
+        if field in blank_fields
+        or _award_column(award_df, field, rows[:0], expanded, source).dtype == object
+    ]
+    block = np.empty((len(text_fields), len(rows)), dtype=object)
+    for i, field in enumerate(text_fields):
+        if field in blank_fields:
+            block[i] = ""
+        else:
+            block[i] = _award_column(award_df, field, rows, expanded, source)
+    table = pd.DataFrame(
+        block.T, index=award_df.index[rows], columns=text_fields, copy=False
+    )
+    for i, field in enumerate(award_fields):
+        if field in text_fields:
+            continue
+        table.insert(i, field, _award_column(award_df, field, rows, expanded, source))
 
-    dfs["award"] = award_df
+    dfs["award"] = table
     dfs["efc"] = efc_df
@@ -0,0 +1,347 @@
+#!python3
+"""
+Module with an in-process stand-in for the Apps Script project, so the
+Google Doc steps (sync_doc_rows, refresh_decisions, read_current_doc) can be
+run and load-tested offline. Sheets are kept as lists of rows (the same
+lists of lists readDataTable returns), in memory or in a json file per doc
+"""
+
+import os
+import json
+import time
+
+from modules import filework
+
+
+def _json_default(x):
+    """Lets numpy scalars through json.dumps"""
+    return x.item() if hasattr(x, "item") else str(x)
+
+
+def _same(a, b):
+    """Sheet cells come back as numbers or strings, so ids are compared on
+    their text (with 12345.0 matching 12345)"""
+    return _cell_key(a) == _cell_key(b)
+
+
+def _cell_key(x):
+    if isinstance(x, float) and x.is_integer():
+        x = int(x)
+    return str(x)
+
+
+class ScriptError(Exception):
+    """An error the real script would report in the response"""
+
+
+class ScriptEmulator:
+    """
+    Implements the Apps Script functions the program calls. Each doc is a
+    dict of tab name -> list of rows (header rows included). If folder is
+    given, each doc is stored as <folder>/<doc_key>.json so the sheets
+    outlive the process (and pool workers see them); otherwise they're only
+    kept in memory.
+
+    latency (seconds per call) and seconds_per_kb (of request plus
+    response) are slept off on every call to mimic the real service, and
+    calls whose request or response is bigger than max_payload_kb fail the
+    way an oversized real call does (0 for no limit).
+
+    decision_header is the header used when refreshDecisions creates the
+    Decisions tab (StudentID, LastFirst, startRow, endRow, choice, ...)
+    """
+
+    FUNCTIONS = {
+        "readDataTable": "read_data_table",
+        "writeDataTable": "write_data_table",
+        "insertEFCStudentRows": "insert_efc_student_rows",
+        "deleteEFCStudentRows": "delete_efc_student_rows",
+        "insertAwardStudentRows": "insert_award_student_rows",
+        "updateAwardStatuses": "update_award_statuses",
+        "deleteAwardStudentRows": "delete_award_student_rows",
+        "refreshDecisionOptions": "refresh_decision_options",
+        "refreshDecisions": "refresh_decisions",
+    }
+
+    def __init__(self, folder=None, latency=0.0, seconds_per_kb=0.0,
+                 max_payload_kb=0, decision_header=None):
+        self.folder = folder
+        self.latency = latency
+        self.seconds_per_kb = seconds_per_kb
+        self.max_payload_kb = max_payload_kb
+        self.decision_header = decision_header or []
+        self._docs = {}
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config):
+        """Builds the emulator described by the script_backend setting"""
+        settings = config["script_backend"]
+        return cls(
+            folder=settings.get("folder") or None,
+            latency=float(settings.get("latency") or 0.0),
+            seconds_per_kb=float(settings.get("seconds_per_kb") or 0.0),
+            max_payload_kb=float(settings.get("max_payload_kb") or 0),
+            decision_header=["StudentID"]
+            + [f for f in config["live_decision_fields"] if f != "Campus"],
+        )
+
+    # ------------------------------------------------------------------
+    # Storage
+    def _doc_path(self, doc_key):
+        return os.path.join(self.folder, "{}.json".format(doc_key))
+
+    def load_doc(self, doc_key):
+        """Returns the dict of tabs for the doc (empty if it's new)"""
+        if self.folder:
+            fn = self._doc_path(doc_key)
+            if not os.path.isfile(fn):
+                return {}
+            with open(fn, "r") as f:
+                return json.load(f)
+        return self._docs.setdefault(doc_key, {})
+
+    def save_doc(self, doc_key, doc):
+        """Stores the dict of tabs for the doc"""
+        if self.folder:
+            fn = self._doc_path(doc_key)
+            with open(fn + ".tmp", "w") as f:
+                json.dump(doc, f, default=_json_default)
+            os.replace(fn + ".tmp", fn)
+        else:
+            self._docs[doc_key] = doc
+
+    def load_local_live(self, doc_key, campus, config):
+        """Fills the doc's EFC, Award and Decisions tabs from the campus's
+        local live files (as saved by the save mode)"""
+        dfs = {}
+        filework.read_local_live_data(dfs, campus, config, False)
+        doc = self.load_doc(doc_key)
+        for sheet in ["efc", "award", "decision"]:
+            if "live_" + sheet not in dfs:
+                continue
+            df = dfs["live_" + sheet]
+            if sheet in ["efc", "decision"]:
+                df = df.reset_index()
+            rows = [df.columns.tolist()] + df.astype(object).where(
+                df.notnull(), ""
+            ).values.tolist()
+            header_row = int(config[sheet + "_header_row"])
+            doc[config[sheet + "_tab_name"]] = [[]] * (header_row - 1) + rows
+        self.save_doc(doc_key, doc)
+
+    # ------------------------------------------------------------------
+    # Calls
+    def _check_payload(self, payload, what):
+        kb = len(json.dumps(payload, default=_json_default)) / 1024.0
+        if self.max_payload_kb and kb > self.max_payload_kb:
+            raise ScriptError(
+                "{} of {:.0f} KB is over the {:.0f} KB limit".format(
+                    what, kb, self.max_payload_kb
+                )
+            )
+        return kb
+
+    def run(self, request):
+        """Runs the request (a dict like the ones passed to
+        googleapi.call_script_service) and returns the function's result,
+        or prints the error and returns None like the real call does"""
+        function = request["function"]
+        parameters = request.get("parameters", [])
+        try:
+            if function not in self.FUNCTIONS:
+                raise ScriptError("Script function not found: " + function)
+            kb = self._check_payload(parameters, "Request")
+            result = getattr(self, self.FUNCTIONS[function])(*parameters)
+            kb += self._check_payload(result, "Response")
+        except ScriptError as e:
+            print("Script error message: {}".format(e))
+            return None
+        time.sleep(self.latency + self.seconds_per_kb * kb)
+        return result
+
+    # ------------------------------------------------------------------
+    # Table helpers
+    @staticmethod
+    def _columns(table, header_row):
+        """Returns a dict of header label -> column number"""
+        return {label: i for i, label in enumerate(table[header_row - 1])}
+
+    @staticmethod
+    def _to_sheet_row(columns, header, row):
+        """Lays out a row given in header's order in the sheet's columns"""
+        values = dict(zip(header, row))
+        return [values.get(label, "") for label in columns]
+
+    def _tab(self, doc, title, header, header_row):
+        """Returns the tab, creating it with header if it doesn't exist"""
+        if title not in doc or not doc[title]:
+            doc[title] = [[]] * (header_row - 1) + [list(header)]
+        return doc[title]
+
+    # ------------------------------------------------------------------
+    # The Apps Script functions
+    def read_data_table(self, doc_key, title):
+        doc = self.load_doc(doc_key)
+        table = doc.get(title)
+        if not table:
+            return [["NULL"]]
+        width = max(len(row) for row in table)
+        return [list(row) + [""] * (width - len(row)) for row in table]
+
+    def write_data_table(self, doc_key, title, table):
+        doc = self.load_doc(doc_key)
+        doc[title] = [list(row) for row in table]
+        self.save_doc(doc_key, doc)
+        return len(table)
+
+    def insert_efc_student_rows(self, doc_key, title, sort_field, header, rows,
+                                header_row):
+        header_row = int(header_row)
+        doc = self.load_doc(doc_key)
+        table = self._tab(doc, title, header, header_row)
+        columns = table[header_row - 1]
+        data = table[header_row:] + [
+            self._to_sheet_row(columns, header, row) for row in rows
+        ]
+        sort_col = columns.index(sort_field)
+        data.sort(key=lambda row: str(row[sort_col]))
+        doc[title] = table[:header_row] + data
+        self.save_doc(doc_key, doc)
+        return len(rows)
+
+    def delete_efc_student_rows(self, doc_key, title, id_field, ids):
+        doc = self.load_doc(doc_key)
+        table = doc.get(title)
+        if not table:
+            raise ScriptError("Sheet not found: " + title)
+        id_col = table[0].index(id_field)
+        ids = {_cell_key(x) for x in ids}
+        kept = [row for row in table[1:] if _cell_key(row[id_col]) not in ids]
+        deleted = len(table) - 1 - len(kept)
+        doc[title] = table[:1] + kept
+        self.save_doc(doc_key, doc)
+        return deleted
+
+    def _award_matches(self, table, header_row, keys):
+        """Returns the data row numbers (in table) matching each
+        (SID, NCESid, Home/Away, ...) tuple in keys"""
+        columns = self._columns(table, header_row)
+        key_cols = [columns["SID"], columns["NCESid"], columns["Home/Away"]]
+        lookup = {}
+        for i in range(header_row, len(table)):
+            row_key = tuple(_cell_key(table[i][c]) for c in key_cols)
+            lookup.setdefault(row_key, []).append(i)
+        return [lookup.get(tuple(_cell_key(x) for x in key[:3]), []) for key in keys]
+
+    def update_award_statuses(self, doc_key, title, result_changes, header_row,
+                              doc=None):
+        header_row = int(header_row)
+        save = doc is None
+        doc = doc if doc is not None else self.load_doc(doc_key)
+        table = doc.get(title)
+        if not table:
+            raise ScriptError("Sheet not found: " + title)
+        result_col = self._columns(table, header_row)["Result (from Naviance)"]
+        changes = 0
+        for change, matches in zip(
+            result_changes, self._award_matches(table, header_row, result_changes)
+        ):
+            for i in matches:
+                if not _same(table[i][result_col], change[3]):
+                    table[i][result_col] = change[3]
+                    changes += 1
+        if save:
+            self.save_doc(doc_key, doc)
+        return changes
+
+    def insert_award_student_rows(self, doc_key, title, result_changes, header,
+                                  rows, header_row):
+        header_row = int(header_row)
+        doc = self.load_doc(doc_key)
+        table = self._tab(doc, title, header, header_row)
+        if result_changes:
+            self.update_award_statuses(
+                doc_key, title, result_changes, header_row, doc=doc
+            )
+        columns = table[header_row - 1]
+        data = table[header_row:] + [
+            self._to_sheet_row(columns, header, row) for row in rows
+        ]
+        # The tab is kept in student order (new rows go with the student's
+        # other colleges)
+        student_col = columns.index("Student")
+        data.sort(key=lambda row: str(row[student_col]))
+        doc[title] = table[:header_row] + data
+        self.save_doc(doc_key, doc)
+        return len(rows)
+
+    def delete_award_student_rows(self, doc_key, title, header_row, keys):
+        header_row = int(header_row)
+        doc = self.load_doc(doc_key)
+        table = doc.get(title)
+        if not table:
+            raise ScriptError("Sheet not found: " + title)
+        to_delete = {i for rows in self._award_matches(table, header_row, keys)
+                     for i in rows}
+        doc[title] = [row for i, row in enumerate(table) if i not in to_delete]
+        self.save_doc(doc_key, doc)
+        # Sheet row numbers (1 based) of the deleted rows
+        return [i + 1 for i in sorted(to_delete)]
+
+    def refresh_decision_options(self, doc_key, title, do_table, app_table):
+        # The programs table sits to the right of the options, one blank
+        # column over
+        width = max(len(row) for row in do_table) + 1
+        table = []
+        for i in range(max(len(do_table), len(app_table))):
+            row = list(do_table[i]) if i < len(do_table) else []
+            row += [""] * (width - len(row))
+            if i < len(app_table):
+                row += list(app_table[i])
+            table.append(row)
+        doc = self.load_doc(doc_key)
+        doc[title] = table
+        self.save_doc(doc_key, doc)
+        return len(do_table)
+
+    def refresh_decisions(self, doc_key, title, options_title, d_table,
+                          header_row):
+        header_row = int(header_row)
+        doc = self.load_doc(doc_key)
+        table = self._tab(doc, title, self.decision_header, header_row)
+        header = table[header_row - 1]
+        columns = self._columns(table, header_row)
+        sid_col = columns["StudentID"]
+        choice_col = 4  # the column after endRow, whatever its label
+        pgr_col = [i for i, x in enumerate(header) if x.startswith("PGR for")]
+        oop_col = [i for i, x in enumerate(header) if x.startswith("Out of Pocket")]
+        existing = {_cell_key(row[sid_col]): row for row in table[header_row:]}
+        options = doc.get(options_title, [])
+
+        data = []
+        for sid, last_first, start_row, end_row, choice, tgr in d_table[1:]:
+            row = list(existing.get(_cell_key(sid), [""] * len(header)))
+            row += [""] * (len(header) - len(row))
+            row[sid_col] = sid
+            row[columns["LastFirst"]] = last_first
+            row[columns["startRow"]] = start_row
+            row[columns["endRow"]] = end_row
+            row[columns["Student TGR"]] = tgr
+            if row[choice_col] == "":
+                row[choice_col] = choice
+            # Stand-ins for the sheet's lookups of the choice in its options
+            pgr, oop = "TBD", "TBD"
+            for option in options[int(start_row) - 1:int(end_row)]:
+                if row[choice_col] != "" and option[1] == row[choice_col]:
+                    pgr, oop = option[3], option[4]
+                    break
+            for col in pgr_col:
+                row[col] = pgr
+            for col in oop_col:
+                row[col] = oop
+            data.append(row)
+        doc[title] = table[:header_row] + data
+        self.save_doc(doc_key, doc)
+        return len(data)
@@ -5,17 +5,125 @@ Modules for working with csv inputs and manipulating them
 """
 
 import os
+import json
 import shutil
+import hashlib
 import yaml
 import csv
+import threading
+import numpy as np
 import pandas as pd
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from modules import basedata
+
+APP_CATEGORIES = ["result_code", "stage", "type"]
+
+# dtypes given to the tables as they're read (see apply_schema): columns
+# with a handful of repeated strings are kept as categoricals and
+# whole-number counts and flags as nullable integers, so a blank cell
+# doesn't turn them into floats
+SCHEMA = {
+    "app": dict.fromkeys(["Campus"] + APP_CATEGORIES, "category"),
+    "ros": dict.fromkeys(
+        ["Campus", "Race/ Eth", "Counselor", "Advisor", "Cohort", "Gender"],
+        "category",
+    ),
+    "college": {
+        "SimpleBarrons": "category",
+        "MoneyCode": "category",
+        "HBCU": "category",
+        "Living": "category",
+        "MoneyYesNo": "Int8",
+        "IL Public": "Int8",
+        "ChiLocal": "Int8",
+    },
+    "live_efc": {
+        "Campus": "category",
+        "Acceptances": "Int32",
+        "Unique Awards": "Int32",
+    },
+    "live_award": {
+        "Home/Away": "category",
+        "Campus": "category",
+        "Result (from Naviance)": "category",
+        "Unique": "Int8",
+        "Award": "Int8",
+    },
+    "live_decision": {"Campus": "category", "startRow": "Int32", "endRow": "Int32"},
+}
+
+# Set by --memory-report: apply_schema then prints each table's memory use
+_memory_report = False
+
+
+def enable_memory_report():
+    """Turns on the memory report for this process"""
+    global _memory_report
+    _memory_report = True
+
+
+def memory_report_enabled():
+    """True if this process prints the memory report"""
+    return _memory_report
+
+
+def _whole_numbers(series, dtype):
+    """Returns the column as the nullable integer dtype, or None if anything
+    in it isn't a whole number in the dtype's range (e.g. text typed into
+    the doc), in which case it's left as read"""
+    numbers = pd.to_numeric(series, errors="coerce")
+    if (numbers.isna() != series.isna()).any():
+        return None
+    info = np.iinfo(dtype.lower())
+    values = numbers.dropna()
+    if ((values % 1 != 0) | (values < info.min) | (values > info.max)).any():
+        return None
+    return numbers.astype(dtype)
+
+
+def apply_schema(df, table):
+    """Gives the columns of df listed in SCHEMA[table] their dtypes (in
+    place) and returns df. With the memory report on, prints the table's
+    memory_usage(deep=True) before and after"""
+    if _memory_report:
+        before = df.memory_usage(deep=True).sum()
+    for column, dtype in SCHEMA[table].items():
+        if column not in df.columns:
+            continue
+        if dtype == "category":
+            df[column] = df[column].astype("category")
+        else:
+            numbers = _whole_numbers(df[column], dtype)
+            if numbers is not None:
+                df[column] = numbers
+    if _memory_report:
+        print(
+            "Memory for {}: {:.2f} MB as read, {:.2f} MB with schema".format(
+                table, before / 1e6, df.memory_usage(deep=True).sum() / 1e6
+            ),
+            flush=True,
+        )
+    return df
 
 
 def process_config(settings_file, campus):
     """Returns a dict of simple keyword configurations based on what
     was in the yaml file and the specific campus"""
+    return build_config(read_settings(settings_file), campus)
+
+
+def read_settings(settings_file):
+    """Parses the yaml settings file and returns the raw dict"""
     with open(settings_file, "r") as ymlfile:
         cfg = yaml.load(ymlfile, Loader=yaml.FullLoader)
+    return cfg
+
+
+def build_config(cfg, campus):
+    """Builds the campus specific config dict from the raw settings dict
+    (as returned by read_settings)"""
     config = {}
 
     # Handle the settings based on the complex/standard switch
@@ -56,6 +164,10 @@ def process_config(settings_file, campus):
         "live_backup_prefix",
         "drive_folder",
         "live_archive_folder",
+        "live_snapshot_folder",
+        "cache_folder",
+        "profile_folder",
+        "script_backend",
         "campus_list",
         "live_award_fields",
         "file_stem",
@@ -132,6 +244,79 @@ def save_live_dfs(dfs, campus, config, debug):
         # We have a special index label to preserve for the efc table only
         index_label = "StudentID" if key in ["efc", "decision"] else "DefaultIndex"
         dfs["live_" + key].to_csv(full_path, index_label=index_label)
+        save_live_snapshot(config, campus, key, dfs["live_" + key], full_path)
+
+
+# Timestamps in the snapshot logs (they sort in time order as text)
+SNAPSHOT_TIME_FORMAT = "%Y%m%d-%H%M%S"
+
+
+def _snapshot_log(config, campus, key):
+    return os.path.join(
+        config["live_snapshot_folder"], "log", "{}-{}.csv".format(campus, key)
+    )
+
+
+def _temp_name(path, suffix="tmp"):
+    """Returns a name to write path under before swapping it in, unique to
+    the process and thread (the campuses of an --async run share a process)"""
+    return "{}.{}-{}.{}".format(path, os.getpid(), threading.get_ident(), suffix)
+
+
+def save_live_snapshot(config, campus, key, df, full_path, timestamp=None):
+    """
+    Adds a live table just saved to full_path to the snapshot store in
+    live_snapshot_folder (if set). Each distinct version of a file is kept
+    once, as a compressed .npz of its columns named by the file's digest,
+    and every save appends a timestamp,digest line to the campus and tab's
+    log (timestamp defaults to now), so an unchanged week only costs a line
+    """
+    folder = config["live_snapshot_folder"]
+    if not folder:
+        return
+    digest = file_digest([full_path])
+    object_path = os.path.join(folder, "objects", digest + ".npz")
+    if not os.path.isfile(object_path):
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        meta, arrays = _frame_arrays(df)
+        temp_path = _temp_name(object_path)
+        with open(temp_path, "wb") as f:
+            np.savez_compressed(f, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(temp_path, object_path)
+    log_path = _snapshot_log(config, campus, key)
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    with open(log_path, "a") as f:
+        if timestamp is None:
+            timestamp = datetime.now().strftime(SNAPSHOT_TIME_FORMAT)
+        f.write("{},{}\n".format(timestamp, digest))
+
+
+def live_snapshots(config, campus, key):
+    """Returns the snapshot log for a campus and tab (efc, award or
+    decision) as a DataFrame of timestamp and digest, oldest first"""
+    log_path = _snapshot_log(config, campus, key)
+    if not os.path.isfile(log_path):
+        return pd.DataFrame(columns=["timestamp", "digest"], dtype=str)
+    return pd.read_csv(log_path, names=["timestamp", "digest"], dtype=str)
+
+
+def read_live_snapshot(config, campus, key, timestamp=None):
+    """
+    Returns a campus and tab's live table as it was at timestamp (the last
+    snapshot saved at or before it, or the latest if timestamp is None), or
+    None if there isn't one. Only that snapshot's file is read
+    """
+    log = live_snapshots(config, campus, key)
+    if timestamp is not None:
+        log = log[log["timestamp"] <= timestamp]
+    if log.empty:
+        return None
+    object_path = os.path.join(
+        config["live_snapshot_folder"], "objects", log["digest"].iloc[-1] + ".npz"
+    )
+    with np.load(object_path, allow_pickle=True) as data:
+        meta = json.loads(str(data["meta"]))
+        return _frame_from_arrays(meta, lambda name, mappable: data[name])
 
 
 def read_local_live_all_decision(dfs, campus, config, debug):
@@ -139,16 +324,18 @@ def read_local_live_all_decision(dfs, campus, config, debug):
     filename = config["live_backup_prefix"] + "-All-decision.csv"
     full_path = os.path.join(config["live_backup_folder"], filename)
     if os.path.isfile(full_path):
-        this_df = pd.read_csv(full_path, index_col=0)
+        this_df = apply_schema(pd.read_csv(full_path, index_col=0), "live_decision")
         dfs["live_decision"] = this_df[this_df["Campus"]==campus]
     else:
         if debug:
             print("{} does not exist".format(full_path))
 
 
-def read_local_live_data(dfs, campus, config, debug):
+def read_local_live_data(dfs, campus, config, debug, schema=True):
     """Loads the live data (recently read from the Google Doc) to the file
-    into the live dataframes"""
+    into the live dataframes. With schema=False the SCHEMA dtypes aren't
+    applied, so the tables are as pandas reads them (e.g. a column of whole
+    numbers with a blank is float)"""
     if debug:
         print("Reading local version of live dataframes", flush=True)
     for key in ["efc", "award", "decision"]:
@@ -156,81 +343,427 @@ def read_local_live_data(dfs, campus, config, debug):
         full_path = os.path.join(config["live_backup_folder"], filename)
         if os.path.isfile(full_path):
             if key in ["efc", "decision"]:
-                dfs["live_" + key] = pd.read_csv(full_path, index_col=0)
+                this_df = pd.read_csv(full_path, index_col=0)
             else:
-                dfs["live_" + key] = pd.read_csv(full_path, index_col=False)
-                dfs["live_" + key].drop(["DefaultIndex"], axis=1, inplace=True)
+                this_df = pd.read_csv(full_path, index_col=False)
+                this_df.drop(["DefaultIndex"], axis=1, inplace=True)
+            if schema:
+                this_df = apply_schema(this_df, "live_" + key)
+            dfs["live_" + key] = this_df
         else:
             if debug:
                 print("{} does not exist".format(full_path))
 
 
+# Campus files read at once by combine_all_local_files, and the rows it
+# writes at a time
+COMBINE_THREADS = 8
+COMBINE_CHUNK_ROWS = 10000
+
+
+def _campus_live_tables(campus, config):
+    """Returns the campus's local live tables for combine_all_local_files,
+    with a Campus column and cut down to the columns of the combined file.
+    They're read without the SCHEMA dtypes so the combined csvs keep the
+    values as written before (e.g. 3.0, not 3, in a column with blanks)"""
+    tables = {}
+    read_local_live_data(tables, campus, config, debug=False, schema=False)
+    for key, df in tables.items():
+        df["Campus"] = campus
+        fields = config[key + "_fields"]
+        tables[key] = df[[field for field in fields if field in df.columns]]
+    return tables
+
+
 def combine_all_local_files(dfs, config, debug):
     """Runs through the list of all campuses and combines to three
-    merged csvs
+    merged csvs. The campus files are read in a thread pool and each
+    table is concatenated once, in campus_list order
     """
     if debug:
         print("About to combine the files for campuses:")
         print(config["campus_list"])
 
-    big_df = {}
-    big_df["live_efc"] = None  # This will be empty for the first pass
-    big_df["live_award"] = None
-    big_df["live_decision"] = None
+    # Read all the files
+    with ThreadPoolExecutor(max_workers=COMBINE_THREADS) as executor:
+        campus_tables = list(
+            executor.map(
+                lambda campus: _campus_live_tables(campus, config),
+                config["campus_list"],
+            )
+        )
 
-    # Merge all the files
-    for campus in config["campus_list"]:
-        if debug:
-            print("Reading data for {}".format(campus), flush=True)
-        read_local_live_data(dfs, campus, config, debug=False)
-        for key in ["live_efc", "live_award", "live_decision"]:
-            if key in dfs.keys():
-                dfs[key]["Campus"] = campus
-                if isinstance(big_df[key], pd.DataFrame):
-                    big_df[key] = pd.concat([big_df[key], dfs[key]], sort=False)
-                else:
-                    big_df[key] = dfs[key]
-                dfs.pop(key)
-
-    # Save
+    # Merge and save
     for key in ["efc", "award", "decision"]:
-        if isinstance(big_df["live_" + key], pd.DataFrame):
-            # Reduce to just the columns we want
-            these_fields = config["live_" + key + "_fields"]
-            big_df["live_" + key] = big_df["live_" + key][these_fields]
-            filename = config["live_backup_prefix"] + "-All-" + key + ".csv"
-            full_path = os.path.join(config["live_backup_folder"], filename)
-            # If the file already exists, we'll backup to the archive directory
-            if os.path.isfile(full_path):
-                archive_path = os.path.join(config["live_archive_folder"], filename)
-                shutil.copy(full_path, archive_path)
-
-            # We have a special index label to preserve for these tables
-            index_label = "StudentID" if key in ["efc", "decision"] else "DefaultIndex"
-            big_df["live_" + key].to_csv(full_path, index_label=index_label)
+        tables = [t["live_" + key] for t in campus_tables if "live_" + key in t]
+        if not tables:
+            continue
+        if debug:
+            print("Combining {} {} tables".format(len(tables), key), flush=True)
+        # Reduce to just the columns we want
+        big_df = pd.concat(tables, sort=False)[config["live_" + key + "_fields"]]
+        filename = config["live_backup_prefix"] + "-All-" + key + ".csv"
+        full_path = os.path.join(config["live_backup_folder"], filename)
+        # If the file already exists, we'll backup to the archive directory
+        if os.path.isfile(full_path):
+            archive_path = os.path.join(config["live_archive_folder"], filename)
+            shutil.copy(full_path, archive_path)
+
+        # We have a special index label to preserve for these tables
+        index_label = "StudentID" if key in ["efc", "decision"] else "DefaultIndex"
+        with open(full_path, "w", newline="", encoding="utf-8") as f:
+            big_df.to_csv(f, index_label=index_label, chunksize=COMBINE_CHUNK_ROWS)
+        save_live_snapshot(config, "All", key, big_df, full_path)
 
 
 def read_standard_csv(fn):
     """
     Reads an input file and returns a DataFrame with first column as index
+    (from the compiled copy if the file hasn't changed; see _read_compiled)
     """
+    return _read_compiled(fn, _parse_standard_csv)
+
+
+def _parse_standard_csv(fn):
     df = pd.read_csv(fn, index_col=0, na_values=["N/A", ""])
     return df
 
 
+def read_strategies(fn):
+    """
+    Reads the strategy definitions and returns them compiled to a grid (see
+    basedata.compile_strategy_grid). The grid is cached next to the csv in an
+    .npz file that is rebuilt whenever the csv's contents change
+    """
+    with open(fn, "rb") as f:
+        source = hashlib.sha1(f.read()).hexdigest()
+    cache_fn = os.path.splitext(fn)[0] + ".npz"
+    try:
+        with np.load(cache_fn) as cached:
+            if cached["source"] == source:
+                return {"grid": cached["grid"], "start": cached["start"]}
+    except (OSError, KeyError, ValueError):
+        pass  # no cache yet (or an unreadable one)
+
+    strat_grid = basedata.compile_strategy_grid(read_standard_csv(fn))
+    temp_fn = _temp_name(cache_fn)
+    try:
+        with open(temp_fn, "wb") as f:
+            np.savez(f, source=source, **strat_grid)
+        os.replace(temp_fn, cache_fn)
+    except OSError:
+        pass  # the cache is optional, e.g. for a read-only settings folder
+    return strat_grid
+
+
+def file_digest(fns, *extra):
+    """Returns a sha1 hex digest of the files' contents plus any extra
+    values (e.g. the campus or the columns read from the files)"""
+    h = hashlib.sha1()
+    for fn in fns:
+        with open(fn, "rb") as f:
+            h.update(f.read())
+    h.update(repr(extra).encode())
+    return h.hexdigest()
+
+
+def _column_arrays(name, column):
+    """Returns the meta file entry for a column (or index) and the arrays
+    it's saved as. Categoricals are saved as codes plus categories and
+    other pandas dtypes (e.g. nullable integers) as objects"""
+    dtype = column.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        arrays = {
+            name: np.asarray(column.cat.codes),
+            name + ".categories": np.asarray(dtype.categories),
+        }
+        return {"kind": "category", "ordered": bool(dtype.ordered)}, arrays
+    if isinstance(dtype, np.dtype):
+        entry = {"kind": "numpy", "objects": dtype == object}
+        return entry, {name: np.asarray(column)}
+    entry = {"kind": "pandas", "dtype": str(dtype)}
+    return entry, {name: np.asarray(column, dtype=object)}
+
+
+def _column_from_arrays(name, entry, load):
+    """Reverses _column_arrays; load(array name, mappable) returns an array
+    (mappable is False for arrays that hold Python objects)"""
+    mappable = entry["kind"] != "pandas" and not entry.get("objects")
+    values = load(name, mappable)
+    if entry["kind"] == "category":
+        categories = load(name + ".categories", False)
+        return pd.Categorical.from_codes(
+            values, categories=categories, ordered=entry["ordered"]
+        )
+    if entry["kind"] == "pandas":
+        return pd.array(values, dtype=entry["dtype"])
+    return values
+
+
+def _frame_arrays(df):
+    """Returns the meta dict and the arrays (see _column_arrays) for saving
+    a DataFrame column by column"""
+    meta = {"columns": list(df.columns), "entries": [], "index_name": df.index.name}
+    arrays = {}
+    for i in range(df.shape[1]):
+        entry, column_arrays = _column_arrays("c{}".format(i), df.iloc[:, i])
+        meta["entries"].append(entry)
+        arrays.update(column_arrays)
+    meta["index"], index_arrays = _column_arrays("index", df.index.to_series())
+    arrays.update(index_arrays)
+    return meta, arrays
+
+
+def _frame_from_arrays(meta, load, mmap=False):
+    """Reverses _frame_arrays (see _column_from_arrays for load). With mmap
+    the loaded columns are used as they are rather than copied into one
+    block"""
+    index = pd.Index(
+        _column_from_arrays(
+            "index", meta["index"], lambda name, mappable: load(name, False)
+        ),
+        name=meta["index_name"],
+    )
+    columns = [
+        _column_from_arrays("c{}".format(i), entry, load)
+        for i, entry in enumerate(meta["entries"])
+    ]
+    df = pd.DataFrame(dict(enumerate(columns)), index=index, copy=not mmap)
+    df.columns = meta["columns"]
+    return df
+
+
+def save_columnar(folder, df, source):
+    """
+    Saves the DataFrame to the folder as one .npy file per column (plus the
+    index) with a meta.json recording the columns, their dtypes and the
+    source digest it was built from (see read_columnar). The folder is
+    written under a temporary name and then swapped in
+    """
+    temp_folder = _temp_name(folder)
+    old_folder = _temp_name(folder, "old")
+    try:
+        os.makedirs(temp_folder, exist_ok=True)
+        meta, arrays = _frame_arrays(df)
+        meta["source"] = source
+        for name, values in arrays.items():
+            np.save(
+                os.path.join(temp_folder, name + ".npy"), values, allow_pickle=True
+            )
+        with open(os.path.join(temp_folder, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        if os.path.isdir(folder):
+            os.replace(folder, old_folder)
+        os.replace(temp_folder, folder)
+    except OSError:
+        pass  # the cache is optional, e.g. for a read-only cache folder
+    finally:
+        for leftover in [temp_folder, old_folder]:
+            shutil.rmtree(leftover, ignore_errors=True)
+
+
+def read_columnar(folder, source, mmap=False):
+    """Returns the DataFrame saved to the folder by save_columnar, or None
+    if there isn't one built from the same source digest. With mmap the
+    numeric columns are memory-mapped from the files (and each kept as its
+    own block rather than being copied into one)"""
+
+    def load(name, mappable):
+        return np.load(
+            os.path.join(folder, name + ".npy"),
+            mmap_mode="c" if mmap and mappable else None,
+            allow_pickle=True,
+        )
+
+    try:
+        with open(os.path.join(folder, "meta.json"), "r") as f:
+            meta = json.load(f)
+        if meta["source"] != source:
+            return None
+        return _frame_from_arrays(meta, load, mmap)
+    except (OSError, KeyError, ValueError):
+        return None  # no cache yet (or an unreadable one)
+
+
+def _read_compiled(fn, parse, version=""):
+    """
+    Returns parse(fn) for a reference table, via a columnar copy of it (the
+    .columns folder next to the csv, see save_columnar) that's memory-mapped
+    on load and rebuilt whenever the csv's size or modified time changes.
+    version is anything else the parsed table depends on
+    """
+    stat = os.stat(fn)
+    source = "{}:{}:{}".format(stat.st_size, stat.st_mtime_ns, version)
+    folder = os.path.splitext(fn)[0] + ".columns"
+    df = read_columnar(folder, source, mmap=True)
+    if df is None:
+        df = parse(fn)
+        save_columnar(folder, df, source)
+    return df
+
+
+def read_enriched_roster(dfs, campus, config, debug):
+    """
+    Returns the roster with the columns from basedata.add_strat_and_grs for
+    the campus. The result is cached (in cache_folder/roster) under a digest
+    of the four files it comes from, so a later run with the same files
+    just loads it
+    """
+    files = [
+        config[key] for key in ["current_roster", "strategies", "targets", "acttosat"]
+    ]
+    source = file_digest(files, campus, config["roster_fields"])
+    folder = os.path.join(config["cache_folder"], "roster", campus)
+    ros_df = read_columnar(folder, source)
+    if ros_df is None:
+        ros_df = basedata.add_strat_and_grs(
+            dfs["ros"], dfs["strat"], dfs["target"], dfs["acttosat"], campus, debug
+        )
+        save_columnar(folder, ros_df, source)
+    elif debug:
+        print("Loaded the enriched roster from {}".format(folder), flush=True)
+    return ros_df
+
+
+# The strings read_csv treats as missing by default (its na_values when
+# keep_default_na is True), for the columns _read_coerced doesn't convert
+DEFAULT_NA_VALUES = {
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "n/a",
+    "nan",
+    "null",
+}
+
+
+def _coerce(values, convert):
+    """
+    Returns values (read as strings) passed through convert (safe2int or
+    safe2f) the way a read_csv converter would leave them: cells that don't
+    convert keep their text, and the result is int64 or float64 if they all
+    do. Each distinct value is only converted once
+    """
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    converted = pd.Series([convert(x) for x in uniques], dtype=object)
+    return converted.infer_objects().to_numpy().take(codes)
+
+
+def _read_coerced(fn, coerce, na_values, usecols, index_col=None, **kwargs):
+    """
+    read_csv with the columns in coerce (a dict of column: safe2int or
+    safe2f) read as text and converted afterwards by _coerce, which is much
+    quicker than giving them as converters. Like converters, those columns
+    skip the missing value handling (a blank stays a blank string) while
+    the rest get na_values on top of DEFAULT_NA_VALUES
+    """
+    na_values = sorted(DEFAULT_NA_VALUES.union(na_values))
+    df = pd.read_csv(
+        fn,
+        usecols=usecols,
+        index_col=index_col,
+        dtype={col: str for col in coerce},
+        keep_default_na=False,
+        na_values={col: na_values for col in usecols if col not in coerce},
+        **kwargs,
+    )
+    for col, convert in coerce.items():
+        if col == index_col:
+            df.index = pd.Index(_coerce(df.index, convert), name=col)
+        elif col in df.columns:
+            df[col] = _coerce(df[col], convert)
+    return df
+
+
 def read_apps(fn, cols):
     """
     Reads the applications file into a DataFrame, using the correct formatting
     for special columns; is passed a list of columns to pay attention to
     """
-    df = pd.read_csv(
+    df = _read_coerced(
         fn,
+        {"hs_student_id": safe2int, "NCES": safe2int},
         na_values=[""],
         encoding="cp1252",
         usecols=cols,
-        converters={"hs_student_id": safe2int, "NCES": safe2int},
     )
-    return df
+    return apply_schema(df, "app")
+
+
+def _csv_records(f):
+    """Yields the raw records of a csv file opened in binary mode (a quoted
+    field can hold line breaks, so a record can span several lines)"""
+    record = b""
+    for line in f:
+        if not record and not line.count(b'"') % 2:
+            yield line
+            continue
+        record += line
+        if not record.count(b'"') % 2:
+            yield record
+            record = b""
+    if record:
+        yield record
+
+
+def _quoted_fields(record, count, encoding):
+    """Returns the first count fields of a raw csv record with quotes in it
+    (as bytes; records without quotes are just split on commas)"""
+    text = record.decode(encoding).rstrip("\r\n")
+    return [field.encode(encoding) for field in next(csv.reader([text]))[:count]]
+
+
+def split_apps(fn, student_campus, campuses, encoding="cp1252"):
+    """
+    Splits the applications file by campus in one pass over its raw text,
+    returning a dict of campus: csv bytes (header included) for read_apps.
+    Only the Campus and hs_student_id fields are looked at, so the rows of
+    other campuses are never parsed or kept. A row goes to the campus in
+    its Campus column and also to its student's roster campus
+    (student_campus maps student ids to campuses) if that's different
+    """
+    parts = {campus.encode(encoding): [] for campus in campuses}
+    roster_campuses = {
+        safe2int(student): campus.encode(encoding)
+        for student, campus in student_campus.items()
+        if campus in campuses
+    }
+    with open(fn, "rb") as f:
+        records = _csv_records(f)
+        header = next(records, b"")
+        names = next(csv.reader([header.decode(encoding)]), [])
+        campus_col = names.index("Campus")
+        student_col = names.index("hs_student_id")
+        count = max(campus_col, student_col) + 1
+        for record in records:
+            if b'"' in record:
+                fields = _quoted_fields(record, count, encoding)
+            else:
+                fields = record.rstrip(b"\r\n").split(b",", count)
+            if len(fields) < count:
+                continue
+            campus = fields[campus_col]
+            if campus in parts:
+                parts[campus].append(record)
+            roster_campus = roster_campuses.get(safe2int(fields[student_col]))
+            if roster_campus is not None and roster_campus != campus:
+                parts[roster_campus].append(record)
+    return {
+        campus.decode(encoding): header + b"".join(rows)
+        for campus, rows in parts.items()
+    }
 
 
 def read_bumplist(fn):
@@ -248,13 +781,9 @@ def read_roster(fn, cols):
     Reads the roster file into a DataFrame, using the correct formatting
     for special columns; is passed a list of columns to use
     """
-    df = pd.read_csv(
+    df = _read_coerced(
         fn,
-        index_col="StudentID",
-        na_values=["N/A", ""],
-        usecols=cols,
-        encoding="cp1252",
-        converters={
+        {
             "EFC": safe2int,
             "ACT": safe2int,
             "InterimSAT": safe2int,
@@ -262,15 +791,24 @@ def read_roster(fn, cols):
             "GPA": safe2f,
             "StudentID": safe2int,
         },
+        index_col="StudentID",
+        na_values=["N/A", ""],
+        usecols=cols,
+        encoding="cp1252",
     )
-    return df
+    return apply_schema(df, "ros")
 
 
 def read_colleges(fn):
     """
     Reads the colleges file into a DataFrame, using the correct formatting
-    for special columns
+    for special columns (from the compiled copy if the file hasn't changed;
+    see _read_compiled)
     """
+    return _read_compiled(fn, _parse_colleges, repr(SCHEMA["college"]))
+
+
+def _parse_colleges(fn):
     df = pd.read_csv(
         fn,
         na_values=["N/A"],
@@ -282,7 +820,7 @@ def read_colleges(fn):
             "Adj6yrGrad_AA_Hisp": p2f,
         },
     )
-    return df
+    return apply_schema(df, "college")
 
 
 def save_csv_from_table(fn, folder, list_of_lists):
@@ -344,9 +882,19 @@ def read_dfs(config, debug):
 
     dfs = {}
     dfs["key"] = read_doclist(config["key_file"])
-    dfs["app"] = read_apps(config["current_applications"], config["app_fields"])
+    dfs.update(read_shared_dfs(config))
+    return dfs
+
+
+def read_shared_dfs(config, apps=True):
+    """Reads the input files that are the same for every campus (everything
+    in read_dfs except the doc key file, which can change mid-run, and the
+    applications if apps is False)"""
+    dfs = {}
+    if apps:
+        dfs["app"] = read_apps(config["current_applications"], config["app_fields"])
     dfs["ros"] = read_roster(config["current_roster"], config["roster_fields"])
-    dfs["strat"] = read_standard_csv(config["strategies"])
+    dfs["strat"] = read_strategies(config["strategies"])
     dfs["target"] = read_standard_csv(config["targets"])
     dfs["college"] = read_colleges(config["colleges"])
     dfs["acttosat"] = read_standard_csv(config["acttosat"])
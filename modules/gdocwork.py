@@ -139,17 +139,22 @@ def correct_headers(dfs, campus, config, debug):
                 pass
 
 
-def read_current_doc(dfs, campus, config, debug):
+def read_current_doc(dfs, campus, config, debug, tabs=None):
     """
     Does a simple read of the two main tables and saves them as dfs.
     If the third table (Decisions) is there, it's read as well.
+    tabs can limit the read to a subset of "efc", "award" and "decision"
+    (e.g. just the ones a previous step changed). Returns a dict of the
+    read time for each tab
     """
     doc_key = dfs["key"].loc[campus, "ss_key"]
 
     if debug:
         print("About to read doc for {}...".format(campus), flush=True)
 
-    sheets = ["efc", "award", "decision"]
+    sheets = [sheet for sheet in ["efc", "award", "decision"]
+              if tabs is None or sheet in tabs]
+    read_times = {}
     for sheet in sheets:
         t0 = time()
 
@@ -160,9 +165,12 @@ def read_current_doc(dfs, campus, config, debug):
                 "parameters": [doc_key, config[sheet + "_tab_name"]],
             }
         )
+        read_times[sheet] = time() - t0
         if debug:
             print(
-                "--{} read completed in {:.2f} seconds".format(sheet, time() - t0),
+                "--{} read completed in {:.2f} seconds".format(
+                    sheet, read_times[sheet]
+                ),
                 flush=True,
             )
         if raw_data[0][0] == "NULL":
@@ -181,10 +189,18 @@ def read_current_doc(dfs, campus, config, debug):
 
     if debug:
         print(
-            "{} lines in award tab and {} lines in efc tab".format(
-                len(dfs["live_award"]), len(dfs["live_efc"])
+            ", ".join(
+                "{} lines in {} tab".format(len(dfs["live_" + sheet]), sheet)
+                for sheet in sheets
+                if "live_" + sheet in dfs
+            )
+        )
+        print(
+            "--read {} tab(s) in {:.2f} seconds total".format(
+                len(sheets), sum(read_times.values())
             )
         )
+    return read_times
 
 
 def _do_table_diff(current_index_set, new_index_set):
@@ -283,7 +299,7 @@ def refresh_decisions(dfs, campus, config, debug):
     )
     a_df["PGR"] = a_df["PGR"].fillna("N/A")
     a_df[cgs] = a_df[cgs].fillna("N/A")
-    a_df[result_code] = a_df[result_code].fillna("TBD")
+    a_df[result_code] = a_df[result_code].astype(object).fillna("TBD")
     a_df = a_df[[sid, college, result_code, "PGR", "out_of_pocket6000", cgs]]
 
     s_df = dfs["live_efc"].copy()
@@ -346,8 +362,9 @@ def refresh_decisions(dfs, campus, config, debug):
         )
         current_row += num_rows  # ready for the next student
 
-    filework.save_csv_from_table("temp_do.csv", ".", do_table)
-    filework.save_csv_from_table("temp_d.csv", ".", d_table)
+    # Named by campus so campuses running at once don't overwrite each other
+    filework.save_csv_from_table("temp_do-{}.csv".format(campus), ".", do_table)
+    filework.save_csv_from_table("temp_d-{}.csv".format(campus), ".", d_table)
 
     ###################################################################
     #  Second, push the starter tables to the doc where the AppsScript
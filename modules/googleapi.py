@@ -4,14 +4,16 @@
 import os
 import pickle
 import socket
-import gspread
+import contextlib
+import threading
 
 from googleapiclient import errors
 from googleapiclient.discovery import build
-from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from google.auth.transport.requests import AuthorizedSession
 
+from modules import profiling
+
 
 CREDENTIAL_STORE_DIR = ".credentials"
 CREDENTIAL_STORE_FILE = "award-letters.json"
@@ -27,16 +29,51 @@ SCRIPT_ID = "Mnmyh2DYQEzLuWOvbDD0zJZ76E4tkxNYa"
 SCRIPT_V = "v1"
 DRIVE_V = "v3"
 
+# If set (see set_script_backend), Apps Script requests go to this object's
+# run(request) method instead of the real service
+_script_backend = None
+# If set (see set_script_limit), a semaphore capping the number of Apps
+# Script calls running at once across threads
+_script_slots = None
+# The credentials for the rest of the process, once got by get_credentials
+# or passed in from the parent of a worker pool by set_credentials. The
+# lock lets only one thread of an async run read (or refresh) the stored ones
+_credentials = None
+_credentials_lock = threading.Lock()
+
+# The timeout applies to every socket in the process, so it's set once here
+# rather than on each call from each campus thread
+socket.setdefaulttimeout(DEFAULT_TIMEOUT)
+
 
 def get_credentials():
     """Gets valid user credentials from storage.
 
     If nothing has been stored, or if the stored credentials are invalid,
-    the OAuth2 flow is completed to obtain the new credentials.
+    the OAuth2 flow is completed to obtain the new credentials. They're
+    kept for the rest of the process (the API clients refresh the token
+    when it expires), so storage is only read once.
 
     Returns:
         credentials, the obtained credential.
     """
+    global _credentials
+    with _credentials_lock:
+        if _credentials is None:
+            _credentials = _stored_credentials()
+        return _credentials
+
+
+def set_credentials(credentials):
+    """Uses credentials got in another process (e.g. the parent of a worker
+    pool) instead of reading them from storage"""
+    global _credentials
+    with _credentials_lock:
+        _credentials = credentials
+
+
+def _stored_credentials():
+    """Does the work of get_credentials"""
     if not os.path.exists(CREDENTIAL_STORE_DIR):
         os.makedirs(CREDENTIAL_STORE_DIR)
     credential_path = os.path.join(CREDENTIAL_STORE_DIR, CREDENTIAL_STORE_FILE)
@@ -49,6 +86,9 @@ def get_credentials():
         if credentials and credentials.expired and credentials.refresh_token:
             credentials.refresh(Request())
         else:
+            # Only needed the first time, so not imported at startup
+            from google_auth_oauthlib.flow import InstalledAppFlow
+
             secret_path = os.path.join(CREDENTIAL_STORE_DIR, CLIENT_SECRET_FILE)
             flow = InstalledAppFlow.from_client_secrets_file(secret_path, SCOPES)
             credentials = flow.run_local_server()
@@ -79,6 +119,8 @@ def gspread_client(credentials):
     and authorizes the client here instead.
     Code copied from answer here: https://github.com/burnash/gspread/issues/472
     """
+    import gspread  # slow to import and only needed once a doc is read
+
     gc = gspread.Client(auth=credentials)
     gc.session = AuthorizedSession(credentials)
     return gc
@@ -111,15 +153,39 @@ def move_spreadsheet_and_share(s_id, folder, credentials=None):
     ).execute()
 
 
+def set_script_backend(backend):
+    """Sends Apps Script calls to backend (e.g. an emulator.ScriptEmulator)
+    for the rest of the process; None goes back to the real service"""
+    global _script_backend
+    _script_backend = backend
+
+
+def set_script_limit(limit):
+    """Lets at most limit Apps Script calls run at once (for runs that make
+    calls from several threads); None or 0 removes the limit"""
+    global _script_slots
+    _script_slots = threading.BoundedSemaphore(limit) if limit else None
+
+
 def call_script_service(request, credentials=None, service=None):
     """
     Handles calls to script service if provided a request dict
     Credentials and/or service can be passed
 
     Handles errors in the function, but returns the request response or
-    a None response if not available
+    a None response if not available. Each call is timed under the Apps
+    Script function name when profiling (not counting any wait for a slot
+    under set_script_limit)
     """
-    socket.setdefaulttimeout(DEFAULT_TIMEOUT)
+    with _script_slots or contextlib.nullcontext():
+        with profiling.timed(request["function"], kind="script"):
+            if _script_backend is not None:
+                return _script_backend.run(request)
+            return _call_apps_script(request, credentials, service)
+
+
+def _call_apps_script(request, credentials, service):
+    """Does the work of call_script_service"""
     if not service:
         if not credentials:
             credentials = get_credentials()
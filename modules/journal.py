@@ -0,0 +1,95 @@
+#!python3
+"""
+Module for the run journal: a record of which campus/stage pairs finished
+in a multi-campus run so a run that dies partway through can be resumed
+"""
+
+import os
+import json
+from datetime import datetime
+
+
+class RunJournal:
+    """
+    Each run gets a folder holding run.json (the mode and whether the run
+    finished) and one append-only <campus>.jsonl file per campus with a line
+    per finished stage. Campuses write to separate files so pool workers
+    never share one, and each line is flushed to disk before moving on
+    """
+
+    def __init__(self, folder, run_id, mode):
+        self.folder = folder
+        self.run_id = run_id
+        self.mode = mode
+        self.path = os.path.join(folder, run_id)
+
+    @classmethod
+    def start(cls, folder, mode):
+        """Creates a new journal for a run of the mode"""
+        run_id = datetime.now().strftime("%Y%m%d-%H%M%S-") + mode
+        journal = cls(folder, run_id, mode)
+        os.makedirs(journal.path, exist_ok=True)
+        journal._write_run_file(finished=False)
+        return journal
+
+    @classmethod
+    def find_unfinished(cls, folder, mode):
+        """Returns the journal of the latest unfinished run of the mode,
+        or None if there isn't one"""
+        if not os.path.isdir(folder):
+            return None
+        for run_id in sorted(os.listdir(folder), reverse=True):
+            run_file = os.path.join(folder, run_id, "run.json")
+            if not os.path.isfile(run_file):
+                continue
+            with open(run_file, "r") as f:
+                info = json.load(f)
+            if info["mode"] == mode:
+                return None if info["finished"] else cls(folder, run_id, mode)
+        return None
+
+    def _write_run_file(self, finished):
+        fn = os.path.join(self.path, "run.json")
+        with open(fn + ".tmp", "w") as f:
+            json.dump({"mode": self.mode, "finished": finished}, f)
+        os.replace(fn + ".tmp", fn)
+
+    def _append(self, campus, record):
+        fn = os.path.join(self.path, campus + ".jsonl")
+        with open(fn, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _records(self, campus):
+        fn = os.path.join(self.path, campus + ".jsonl")
+        if not os.path.isfile(fn):
+            return []
+        records = []
+        with open(fn, "r") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break  # partial last line from a crash mid-write
+        return records
+
+    def stage_done(self, campus, stage_name):
+        """Records that a stage finished for the campus"""
+        self._append(campus, {"stage": stage_name})
+
+    def campus_done(self, campus):
+        """Records that every stage finished for the campus"""
+        self._append(campus, {"campus_done": True})
+
+    def finish(self):
+        """Marks the whole run as finished so it won't be resumed"""
+        self._write_run_file(finished=True)
+
+    def completed_stages(self, campus):
+        """Returns the names of the stages the campus finished"""
+        return [r["stage"] for r in self._records(campus) if "stage" in r]
+
+    def is_campus_done(self, campus):
+        """True if the campus finished in this run"""
+        return any(r.get("campus_done") for r in self._records(campus))
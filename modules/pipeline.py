@@ -0,0 +1,186 @@
+#!python3
+"""
+Module for running a set of stages that declare their inputs and outputs.
+Modes are just lists of target stages; the engine works out which other
+stages are needed and in what order, and skips any stage whose inputs have
+the same content hash as the last time it ran for the campus
+"""
+
+import os
+import json
+import pickle
+import hashlib
+from collections import namedtuple
+import pandas as pd
+
+from modules import profiling
+
+
+# func is called as func(dfs, campus, config, debug), like the module level
+# functions in gdocwork/filework/reports. inputs and outputs are artifact
+# names (see the artifacts dict passed to run). Volatile stages read from or
+# write to outside sources (Google Docs, local files) and always run
+Stage = namedtuple("Stage", ["name", "func", "inputs", "outputs", "volatile"])
+Stage.__new__.__defaults__ = (False,)
+
+
+def plan(stages, targets):
+    """
+    Returns the list of stages needed to build the targets (a list of stage
+    names) in the order they should run. Dependencies are found by matching
+    each input artifact to the single stage that outputs it; independent
+    stages run in the order they are listed in the targets/inputs
+    """
+    by_name = {stage.name: stage for stage in stages}
+    producers = {}
+    for stage in stages:
+        for artifact in stage.outputs:
+            if artifact in producers:
+                raise RuntimeError(
+                    "Artifact {} is output by both {} and {}".format(
+                        artifact, producers[artifact].name, stage.name
+                    )
+                )
+            producers[artifact] = stage
+
+    order = []
+    done = set()
+    visiting = set()
+
+    def visit(stage):
+        if stage.name in done:
+            return
+        if stage.name in visiting:
+            raise RuntimeError("Stage {} depends on itself".format(stage.name))
+        visiting.add(stage.name)
+        for artifact in stage.inputs:
+            if artifact in producers:
+                visit(producers[artifact])
+        visiting.remove(stage.name)
+        done.add(stage.name)
+        order.append(stage)
+
+    for target in targets:
+        visit(by_name[target])
+    return order
+
+
+def external_inputs(ordered_stages):
+    """Returns the artifacts that the stages need but don't produce"""
+    produced = {a for stage in ordered_stages for a in stage.outputs}
+    return {a for stage in ordered_stages for a in stage.inputs} - produced
+
+
+def _hash_value(value, h):
+    """Adds the content of a DataFrame (or other value) to the hash object"""
+    if isinstance(value, pd.DataFrame):
+        h.update(repr(list(value.columns)).encode())
+        h.update(repr(list(value.dtypes.astype(str))).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    else:
+        h.update(pickle.dumps(value))
+
+
+def hash_inputs(stage, dfs, artifacts, config):
+    """Returns a hex digest of the stage's config and input artifacts"""
+    h = hashlib.sha1(stage.name.encode())
+    h.update(json.dumps(config, sort_keys=True, default=str).encode())
+    for artifact in stage.inputs:
+        for key in artifacts[artifact]:
+            h.update(key.encode())
+            _hash_value(dfs.get(key), h)
+    return h.hexdigest()
+
+
+def _state_path(state_folder, campus):
+    return os.path.join(state_folder, campus + ".json")
+
+
+def _output_path(state_folder, campus, stage):
+    return os.path.join(state_folder, campus + "-" + stage.name + ".pkl")
+
+
+def _load_state(state_folder, campus):
+    """Reads the input hashes from the last run of each stage"""
+    fn = _state_path(state_folder, campus)
+    if os.path.isfile(fn):
+        with open(fn, "r") as f:
+            return json.load(f)
+    return {}
+
+
+def _save_state(state_folder, campus, state):
+    """Writes the state file via a temp file so a crash can't truncate it"""
+    fn = _state_path(state_folder, campus)
+    with open(fn + ".tmp", "w") as f:
+        json.dump(state, f, indent=1)
+    os.replace(fn + ".tmp", fn)
+
+
+def _save_outputs(state_folder, campus, stage, dfs, artifacts):
+    """Pickles the dfs the stage produced so a later skip can restore them"""
+    keys = [key for a in stage.outputs for key in artifacts[a] if key in dfs]
+    if keys:
+        with open(_output_path(state_folder, campus, stage), "wb") as f:
+            pickle.dump({key: dfs[key] for key in keys}, f)
+
+
+def _restore_outputs(state_folder, campus, stage, dfs, artifacts):
+    """Loads saved outputs into dfs. Returns False if they're needed but
+    missing, in which case the stage has to run"""
+    if not any(artifacts[a] for a in stage.outputs):
+        return True  # side effects only (pushes, file writes) done before a resume
+    fn = _output_path(state_folder, campus, stage)
+    if not os.path.isfile(fn):
+        return False
+    with open(fn, "rb") as f:
+        dfs.update(pickle.load(f))
+    return True
+
+
+def run(stages, targets, artifacts, dfs, campus, config, debug, state_folder,
+        force=False, completed=(), on_stage_done=None):
+    """
+    Runs the stages needed for the targets, updating dfs in place.
+    artifacts maps each artifact name to the dfs keys that hold it (an empty
+    tuple for artifacts that only exist outside the program, e.g. a synced
+    Google Doc). Non-volatile stages are skipped (and their saved outputs
+    restored) if their input hashes match the last run unless force is set.
+
+    For resuming a run, completed lists stage names that already finished
+    (volatile or not); they're skipped if their outputs can be restored.
+    on_stage_done, if passed, is called with each stage name that finishes
+    """
+    ordered_stages = plan(stages, targets)
+    os.makedirs(state_folder, exist_ok=True)
+    state = _load_state(state_folder, campus)
+
+    for stage in ordered_stages:
+        if stage.name in completed and _restore_outputs(
+            state_folder, campus, stage, dfs, artifacts
+        ):
+            if debug:
+                print("Skipping {} (finished before resume)".format(stage.name))
+            continue
+
+        input_hash = hash_inputs(stage, dfs, artifacts, config)
+        if (
+            not force
+            and not stage.volatile
+            and state.get(stage.name) == input_hash
+            and _restore_outputs(state_folder, campus, stage, dfs, artifacts)
+        ):
+            if debug:
+                print("Skipping {} (inputs unchanged)".format(stage.name))
+        else:
+            with profiling.timed(stage.name):
+                stage.func(dfs, campus, config, debug)
+            # Outputs are saved even for volatile stages so a resumed run
+            # doesn't have to repeat their reads
+            _save_outputs(state_folder, campus, stage, dfs, artifacts)
+            if not stage.volatile:
+                state[stage.name] = input_hash
+                _save_state(state_folder, campus, state)
+
+        if on_stage_done:
+            on_stage_done(stage.name)
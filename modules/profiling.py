@@ -0,0 +1,114 @@
+#!python3
+"""
+Module for recording wall and CPU time of the parts of a run (--profile)
+"""
+
+import os
+import json
+import time
+import contextlib
+import contextvars
+
+# None when profiling is off; otherwise a list of timing records
+_records = None
+# The campus being processed, so nested timings (e.g. Apps Script calls
+# made inside a stage) are attributed to it
+_campus = contextvars.ContextVar("campus", default=None)
+
+
+def enable():
+    """Turns on recording for this process"""
+    global _records
+    if _records is None:
+        _records = []
+
+
+def is_enabled():
+    """True if this process is recording timings"""
+    return _records is not None
+
+
+@contextlib.contextmanager
+def campus(name):
+    """Attributes timings inside the with block to the campus"""
+    token = _campus.set(name)
+    try:
+        yield
+    finally:
+        _campus.reset(token)
+
+
+@contextlib.contextmanager
+def timed(name, kind="stage"):
+    """Records the wall and CPU time of the with block. CPU time is the
+    calling thread's, so campuses running in threads of an --async run
+    don't count each other's work (nor is work a stage hands to threads of
+    its own, e.g. combine's reads, counted). Does nothing if profiling
+    isn't enabled"""
+    if _records is None:
+        yield
+        return
+    wall0 = time.perf_counter()
+    cpu0 = time.thread_time()
+    try:
+        yield
+    finally:
+        _records.append(
+            {
+                "campus": _campus.get(),
+                "kind": kind,
+                "name": name,
+                "wall": time.perf_counter() - wall0,
+                "cpu": time.thread_time() - cpu0,
+            }
+        )
+
+
+def take_records():
+    """Returns the records so far and clears them (used by pool workers to
+    send their timings back with each campus result)"""
+    global _records
+    if _records is None:
+        return []
+    records, _records = _records, []
+    return records
+
+
+def add_records(records):
+    """Adds records collected in another process"""
+    if _records is not None:
+        _records.extend(records)
+
+
+def summarize(records):
+    """Returns totals by kind/name: count, wall and cpu seconds"""
+    totals = {}
+    for r in records:
+        key = r["kind"] + ":" + r["name"]
+        total = totals.setdefault(key, {"count": 0, "wall": 0.0, "cpu": 0.0})
+        total["count"] += 1
+        total["wall"] += r["wall"]
+        total["cpu"] += r["cpu"]
+    return totals
+
+
+def write_report(folder, run_id, mode, debug):
+    """Saves all the records from this run to a json file in folder and
+    prints the totals. Returns the filename"""
+    records = _records or []
+    totals = summarize(records)
+    os.makedirs(folder, exist_ok=True)
+    fn = os.path.join(folder, "{}-{}-profile.json".format(run_id, mode))
+    with open(fn, "w") as f:
+        json.dump({"mode": mode, "totals": totals, "records": records}, f, indent=1)
+
+    if debug:
+        print("{:<48} {:>6} {:>9} {:>9}".format("Timing", "Count", "Wall", "CPU"))
+        for key, t in sorted(totals.items(), key=lambda x: -x[1]["wall"]):
+            print(
+                "{:<48} {:>6} {:>9.2f} {:>9.2f}".format(
+                    key, t["count"], t["wall"], t["cpu"]
+                )
+            )
+        print("Profile saved to {}".format(fn))
+    return fn
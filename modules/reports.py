@@ -39,8 +39,10 @@ def write_array(ws, r, c, val, f=None):
         ws.write_formula(r, c, val)
 
 
-def create_formats(wb, cfg_fmt, f_db={}):
+def create_formats(wb, cfg_fmt, f_db=None):
     """Takes a workbook and (likely empty) database to fill with formats"""
+    if f_db is None:
+        f_db = {}  # a new one per workbook (campuses can run in threads)
     for name, db in cfg_fmt.items():
         f_db[name] = wb.add_format(db)
 
@@ -0,0 +1,164 @@
+#!python3
+"""
+Module for sharing inputs across all of the campuses in a single run
+"""
+
+import io
+import threading
+from datetime import datetime
+
+from modules import basedata
+from modules import filework
+from modules import profiling
+
+
+class RunSession:
+    """
+    Loads the settings file and the shared csv inputs once per run and
+    hands out cheap per-campus views of them. Each campus gets its own dfs
+    dict (so it can add and replace keys freely), but the DataFrames
+    inside are shared and must be treated as read-only
+
+    Run-wide options (force, to rerun stages with unchanged inputs;
+    resume, to continue an unfinished run; cprofile, to save a cProfile
+    dump per campus; network_roster, to enrich the whole roster once and
+    slice each campus from it; campus_apps, to parse only each campus's
+    applications) and the run journal are kept here too. Pickling a
+    session (to hand it to a pool worker) keeps the options but drops
+    anything already loaded
+    """
+
+    def __init__(self, settings_file, force=False, resume=False, cprofile=False,
+                 network_roster=False, campus_apps=False):
+        self.settings_file = settings_file
+        self.force = force
+        self.resume = resume
+        self.cprofile = cprofile
+        self.network_roster = network_roster
+        self.campus_apps = campus_apps
+        self.run_id = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.profile = profiling.is_enabled()
+        self.memory_report = filework.memory_report_enabled()
+        self.journal = None
+        self._cfg = None
+        self._configs = {}
+        self._shared_dfs = None
+        self._app_parts = None
+        self._script_backend = None
+        # Guards the loads when campuses run in threads (--async)
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(
+            {
+                "_cfg": None,
+                "_configs": {},
+                "_shared_dfs": None,
+                "_app_parts": None,
+                "_script_backend": None,
+            }
+        )
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def settings(self):
+        """Returns the raw settings dict, parsing the yaml on first use"""
+        if self._cfg is None:
+            self._cfg = filework.read_settings(self.settings_file)
+        return self._cfg
+
+    def config(self, campus):
+        """Returns the config dict for a campus (built once per campus)"""
+        if campus not in self._configs:
+            self._configs[campus] = filework.build_config(self.settings(), campus)
+        return self._configs[campus]
+
+    def script_backend(self):
+        """Returns the Apps Script emulator if the script_backend setting
+        asks for one (built once, so an in-memory emulator keeps its docs
+        for the whole run), otherwise None for the real service"""
+        config = self.config("All")
+        if config["script_backend"]["type"] != "emulator":
+            return None
+        with self._lock:
+            if self._script_backend is None:
+                from modules.emulator import ScriptEmulator
+
+                self._script_backend = ScriptEmulator.from_config(config)
+        return self._script_backend
+
+    def key_dfs(self, campus):
+        """Returns a fresh dfs dict with just the doc key table. The key
+        file is re-read every time because make_new appends to it"""
+        return {"key": filework.read_doclist(self.config(campus)["key_file"])}
+
+    def _split_roster(self, debug):
+        """Enriches the whole roster (see filework.read_enriched_roster) and
+        splits it by campus for the enrich_roster stage to slice from"""
+        shared = self._shared_dfs
+        with profiling.timed("enrich_network", kind="input"):
+            ros_df = filework.read_enriched_roster(
+                shared, "All", self.config("All"), debug
+            )
+            return basedata.split_by_campus(ros_df, shared["acttosat"])
+
+    def _split_apps(self, campus):
+        """Splits the applications file (see filework.split_apps) for every
+        campus in a network run and just this one otherwise"""
+        campuses = [campus]
+        if self.network_roster:
+            campuses += self.config("All")["campus_list"]
+        ros_df = self._shared_dfs["ros"]
+        with profiling.timed("split_apps", kind="input"):
+            self._app_parts = filework.split_apps(
+                self.config(campus)["current_applications"],
+                dict(zip(ros_df.index, ros_df["Campus"])),
+                campuses,
+            )
+
+    def _campus_apps(self, campus):
+        """Returns the campus's applications, parsed from its part of the
+        split file (the whole file is read once for "All")"""
+        config = self.config(campus)
+        if campus == "All":
+            with self._lock:
+                if "app" not in self._shared_dfs:
+                    self._shared_dfs["app"] = filework.read_apps(
+                        config["current_applications"], config["app_fields"]
+                    )
+            return self._shared_dfs["app"]
+        with self._lock:
+            if self._app_parts is None or campus not in self._app_parts:
+                self._split_apps(campus)
+            part = self._app_parts[campus]
+        with profiling.timed("read_apps", kind="input"):
+            return filework.read_apps(io.BytesIO(part), config["app_fields"])
+
+    def dfs(self, campus, debug):
+        """Equivalent to filework.read_dfs, but the input files are only
+        read the first time this is called in the run (with campus_apps,
+        each campus's applications are read when it asks for them)"""
+        with self._lock:
+            if self._shared_dfs is None:
+                if debug:
+                    print("Reading configuration inputs", flush=True)
+                with profiling.campus(campus), profiling.timed(
+                    "read_dfs", kind="input"
+                ):
+                    self._shared_dfs = filework.read_shared_dfs(
+                        self.config(campus), apps=not self.campus_apps
+                    )
+                if self.network_roster:
+                    with profiling.campus(campus):
+                        self._shared_dfs["ros_by_campus"] = self._split_roster(debug)
+        dfs = self.key_dfs(campus)
+        dfs.update(self._shared_dfs)
+        if self.campus_apps:
+            with profiling.campus(campus):
+                dfs["app"] = self._campus_apps(campus)
+        return dfs
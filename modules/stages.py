@@ -0,0 +1,294 @@
+#!python3
+"""
+Module defining the stages of the award letter process and the modes
+(sets of target stages) that can be run from process_awards.py
+"""
+
+import importlib
+
+from modules.pipeline import Stage
+
+# The modules doing the work are only imported when a stage that uses them
+# runs, so e.g. a combine or report run never loads the Google API libraries:
+#   filework: works with csv and yaml inputs
+#   basedata: creates "clean" tables for Google Docs
+#   gdocwork: works with the Google Docs
+#   reports: creates Excel reports for a campus
+#   pdf_reports: creates PDF reports
+
+
+# Artifacts are the things stages pass to each other, mapped to the keys in
+# dfs that hold them. Several artifacts can share dfs keys (e.g. each re-read
+# of the Google Doc replaces the live_ tables) because the engine hashes an
+# artifact's keys right before the stage that consumes it. Empty tuples are
+# for artifacts that only exist outside the program (a synced Google Doc,
+# files written to disk). Stages that write to a Google Doc or to disk are
+# volatile like the ones that read from outside, so a rerun (e.g. after
+# rolling back a doc) always repeats them; only the in-memory stages are
+# skipped when their inputs are unchanged
+LIVE_KEYS = ("live_efc", "live_award", "live_decision")
+ARTIFACTS = {
+    "key": ("key",),
+    "inputs": (
+        "app",
+        "strat",
+        "target",
+        "college",
+        "acttosat",
+        "bump_list",
+        "ambitious_pp",
+    ),
+    "raw_roster": ("ros",),
+    "roster": ("ros",),
+    "clean": ("award", "efc"),
+    "doc_live": LIVE_KEYS,
+    "doc_live_synced": ("live_efc", "live_award"),
+    "doc_live_final": ("live_decision",),
+    "local_live": LIVE_KEYS,
+    "report_live": LIVE_KEYS,
+    "doc_live_archive": LIVE_KEYS,
+    "old_live": ("old_live_efc", "old_live_award", "old_live_decision"),
+    "report": ("award_report", "student_report"),
+    "local_report": ("award_report", "student_report"),
+    "doc_synced": (),
+    "doc_decided": (),
+    "live_saved": (),
+    "final_live_saved": (),
+    "headers_checked": (),
+    "new_doc": (),
+    "local_synced": (),
+    "local_decided": (),
+    "combined": (),
+    "excel": (),
+    "local_excel": (),
+    "campus_pdf": (),
+    "student_pdfs": (),
+}
+
+
+def _lazy(module_name, func_name, **kwargs):
+    """Returns a stage function that imports modules.<module_name> the first
+    time it's called and then calls func_name with the standard arguments
+    (plus any keyword arguments given here)"""
+
+    def stage_func(dfs, campus, config, debug):
+        module = importlib.import_module("modules." + module_name)
+        return getattr(module, func_name)(dfs, campus, config, debug, **kwargs)
+
+    stage_func.__name__ = func_name
+    return stage_func
+
+
+# Wrappers to give each step the standard (dfs, campus, config, debug) call
+def _enrich_roster(dfs, campus, config, debug):
+    """Add calculated fields to roster files. In a run that enriched the
+    whole network up front (see RunSession) the campus's rows are sliced
+    from that; otherwise see filework.read_enriched_roster"""
+    from modules import basedata
+    from modules import filework
+
+    if "ros_by_campus" in dfs:
+        dfs["ros"] = basedata.campus_roster(dfs["ros_by_campus"], campus)
+    else:
+        dfs["ros"] = filework.read_enriched_roster(dfs, campus, config, debug)
+
+
+def _make_clean_gdocs(dfs, campus, config, debug):
+    """Add award and efc to the dfs dict: these are the "blank" tables that
+    don't yet have any award info"""
+    from modules import basedata
+
+    basedata.make_clean_gdocs(dfs, config, debug)
+
+
+def _write_new_doc(dfs, campus, config, debug):
+    """Write a blank document if completely blank (write_new_doc returns
+    None if doc exists) and save the new key"""
+    from modules import filework
+    from modules import gdocwork
+
+    new_key = gdocwork.write_new_doc(dfs, campus, config, debug)
+    if new_key:
+        filework.save_to_doclist(config["key_file"], campus, new_key)
+
+
+def _read_local_live_for_report(dfs, campus, config, debug):
+    """Reads the local live data; the All-decision read is a hack to read the
+    "All" version of the decision tab instead of the campus one"""
+    from modules import filework
+
+    filework.read_local_live_data(dfs, campus, config, debug)
+    if campus != "All":
+        filework.read_local_live_all_decision(dfs, campus, config, debug)
+
+
+def _stash_old_live(dfs, campus, config, debug):
+    """Keeps the local live tables for comparing with the current doc"""
+    for df in ["efc", "award", "decision"]:
+        if f"live_{df}" in dfs:
+            dfs[f"old_live_{df}"] = dfs[f"live_{df}"]
+
+
+def _refresh_decisions(dfs, campus, config, debug):
+    from modules import gdocwork
+
+    if debug:
+        print("Refreshing decisions (make sure you refreshed award data first!)")
+    gdocwork.refresh_decisions(dfs, campus, config, debug)
+
+
+def _combine(dfs, campus, config, debug):
+    """Create combined outputs for the three main tables"""
+    from modules import filework
+
+    filework.combine_all_local_files(dfs, config, debug)
+
+
+STAGES = [
+    # Local csv inputs (key, inputs, raw_roster) come from the RunSession
+    Stage("enrich_roster", _enrich_roster, ("raw_roster", "inputs"), ("roster",)),
+    Stage("clean_gdocs", _make_clean_gdocs, ("roster", "inputs"), ("clean",)),
+    # Read the Google Docs and save to local file, merge Google Docs info
+    # and write back to Google Docs (just the presence of rows; don't
+    # overwrite values), then update the Decisions tab after refreshing
+    # the award data tab. The re-reads only cover the tabs that the step
+    # before them could have changed
+    Stage(
+        "read_doc", _lazy("gdocwork", "read_current_doc"), ("key",),
+        ("doc_live",), True,
+    ),
+    Stage(
+        "save_live", _lazy("filework", "save_live_dfs"), ("doc_live",),
+        ("live_saved",), True,
+    ),
+    Stage(
+        "sync_rows", _lazy("gdocwork", "sync_doc_rows"),
+        ("key", "clean", "doc_live"), ("doc_synced",), True,
+    ),
+    Stage(
+        "read_doc_synced",
+        _lazy("gdocwork", "read_current_doc", tabs={"efc", "award"}),
+        ("key", "doc_synced"),
+        ("doc_live_synced",),
+        True,
+    ),
+    Stage(
+        "refresh_decisions", _lazy("gdocwork", "refresh_decisions"),
+        ("key", "roster", "inputs", "doc_live_synced"), ("doc_decided",), True,
+    ),
+    Stage(
+        "read_doc_final",
+        _lazy("gdocwork", "read_current_doc", tabs={"decision"}),
+        ("key", "doc_decided"),
+        ("doc_live_final",),
+        True,
+    ),
+    Stage(
+        "save_final_live", _lazy("filework", "save_live_dfs"),
+        ("doc_live_synced", "doc_live_final"),
+        ("final_live_saved",),
+        True,
+    ),
+    Stage(
+        "report_tables", _lazy("reports", "create_report_tables"),
+        ("roster", "inputs", "doc_live_synced", "doc_live_final"), ("report",),
+    ),
+    Stage(
+        "excel", _lazy("reports", "create_excel"), ("report", "inputs"),
+        ("excel",), True,
+    ),
+    # Blank document for a new year
+    Stage("write_new_doc", _write_new_doc, ("key", "clean"), ("new_doc",), True),
+    # Steps that work from the live files saved locally
+    Stage(
+        "local_live", _lazy("filework", "read_local_live_data"), (),
+        ("local_live",), True,
+    ),
+    Stage(
+        "push_local", _lazy("gdocwork", "sync_doc_rows"),
+        ("key", "clean", "local_live"), ("local_synced",), True,
+    ),
+    Stage(
+        "refresh_local_decisions", _refresh_decisions,
+        ("key", "roster", "inputs", "local_live"), ("local_decided",), True,
+    ),
+    Stage("combine", _combine, ("key",), ("combined",), True),
+    Stage(
+        "report_live", _read_local_live_for_report, (), ("report_live",), True
+    ),
+    Stage(
+        "local_report_tables", _lazy("reports", "create_report_tables"),
+        ("roster", "inputs", "report_live"), ("local_report",),
+    ),
+    Stage(
+        "local_excel", _lazy("reports", "create_excel"), ("local_report", "inputs"),
+        ("local_excel",), True,
+    ),
+    Stage(
+        "campus_pdf",
+        _lazy("pdf_reports", "create_pdfs", single_pdf=False),
+        ("local_report",),
+        ("campus_pdf",),
+        True,
+    ),
+    Stage(
+        "student_pdfs", _lazy("pdf_reports", "create_pdfs"), ("local_report",),
+        ("student_pdfs",), True,
+    ),
+    # Archive: compare the local live files with the current doc.
+    # (old_live is listed first so the local read happens before the doc
+    # read replaces the live_ tables)
+    Stage("stash_old_live", _stash_old_live, ("local_live",), ("old_live",), True),
+    Stage(
+        "read_doc_archive", _lazy("gdocwork", "read_current_doc"),
+        ("key", "old_live"), ("doc_live_archive",), True,
+    ),
+    Stage(
+        "correct_headers", _lazy("gdocwork", "correct_headers"),
+        ("old_live", "doc_live_archive"), ("headers_checked",), True,
+    ),
+]
+
+
+# Stages that call the Google APIs (a run that spreads campuses over
+# workers gets the credentials once before starting them)
+GOOGLE_STAGES = {
+    "read_doc",
+    "sync_rows",
+    "read_doc_synced",
+    "refresh_decisions",
+    "read_doc_final",
+    "write_new_doc",
+    "push_local",
+    "refresh_local_decisions",
+    "read_doc_archive",
+}
+
+
+def uses_google(mode):
+    """Returns whether a run of the mode calls the Google APIs"""
+    from modules.pipeline import plan
+
+    return any(stage.name in GOOGLE_STAGES for stage in plan(STAGES, MODES[mode]))
+
+
+# Each mode is the list of target stages to build, in order
+MODES = {
+    "all": ["save_live", "save_final_live", "excel"],
+    "save": ["save_live"],
+    # Finish correct_headers by adding a push to Apps script plus a re-read
+    # of the live_dfs
+    "archive": ["correct_headers"],
+    "make_new": ["write_new_doc"],
+    "push_local": ["push_local"],
+    "combine": ["combine"],
+    "refresh_decisions": ["refresh_local_decisions"],
+    "report": ["local_excel"],
+    # campus_pdf creates a combined campus file and student_pdfs creates
+    # one per student
+    "report_single": ["campus_pdf", "student_pdfs"],
+}
+
+# Modes whose campuses have to run one at a time: write_new_doc adds each
+# new doc's key to the key_file shared by every campus
+SERIAL_MODES = {"make_new"}
@@ -4,30 +4,276 @@
    containing award letters"""
 
 import argparse
+import asyncio
+import contextlib
+import cProfile
+import functools
+import io
+import os
+import sys
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from time import time
 
-from modules import filework  # Works with csv and yaml inputs
-from modules import basedata  # Creates "clean" tables for Google Docs
-from modules import gdocwork  # Works with the Google Docs
-from modules import reports  # creates Excel reports for a campus
-from modules import pdf_reports  # creates PDF reports
+from modules import session as run_session  # Shares inputs across campuses
+from modules import pipeline  # Runs stages in dependency order
+from modules import stages  # Defines the stages and modes
+from modules import profiling  # Stage timings for --profile
+from modules import filework  # Table dtypes (and --memory-report)
+from modules.journal import RunJournal  # Records progress for --resume
 
 
-def all_main(settings_file, mode, campus, debug, skip):
-    """Meta function to call the below in series, looping through campuses"""
-    config = filework.process_config(settings_file, campus)
+# Each pool worker process keeps one session for all the campuses it runs
+_worker_session = None
+
+
+def _init_worker(session, credentials):
+    """Initializer for pool workers (credentials, if got by the parent, are
+    shared so the workers don't each read or refresh the stored ones)"""
+    global _worker_session
+    _worker_session = session
+    if credentials is not None:
+        from modules import googleapi
+
+        googleapi.set_credentials(credentials)
+    if session.profile:
+        profiling.enable()
+    if session.memory_report:
+        filework.enable_memory_report()
+
+
+def _main_catching_errors(settings_file, mode, campus, debug, session):
+    """Runs main() for one campus, printing the traceback of any error
+    instead of raising it. Returns the status ("ok" or "FAILED")"""
+    try:
+        main(settings_file, mode, campus, debug, session)
+        return "ok"
+    except (Exception, SystemExit):
+        traceback.print_exc()
+        return "FAILED"
+
+
+def _run_campus(settings_file, mode, campus, debug):
+    """Worker function for the campus pool: runs main() for one campus with
+    its output captured so campuses don't interleave. Returns a status dict"""
+    output = io.StringIO()
+    t0 = time()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        status = _main_catching_errors(
+            settings_file, mode, campus, debug, _worker_session
+        )
+    return {
+        "campus": campus,
+        "status": status,
+        "seconds": time() - t0,
+        "output": output.getvalue(),
+        "records": profiling.take_records(),
+    }
+
+
+# In an async run, each campus thread's output goes to its own buffer
+_thread_output = threading.local()
+
+
+class _ThreadOutput(io.TextIOBase):
+    """Stands in for sys.stdout and sys.stderr during an async run, sending
+    writes to the buffer of the campus running in the current thread (or
+    to the real stream outside of a campus thread)"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def _target(self):
+        return getattr(_thread_output, "buffer", None) or self.stream
+
+    def write(self, s):
+        return self._target().write(s)
+
+    def flush(self):
+        self._target().flush()
+
+
+def _run_campus_thread(settings_file, mode, campus, debug, session):
+    """Like _run_campus, for a campus running in a thread of an async run.
+    Timings are recorded straight into this process's profiling records"""
+    output = io.StringIO()
+    _thread_output.buffer = output
+    t0 = time()
+    try:
+        status = _main_catching_errors(settings_file, mode, campus, debug, session)
+    finally:
+        _thread_output.buffer = None
+    return {
+        "campus": campus,
+        "status": status,
+        "seconds": time() - t0,
+        "output": output.getvalue(),
+        "records": [],
+    }
+
+
+async def _run_campuses_async(settings_file, mode, campuses, debug, session,
+                              limit):
+    """Runs up to limit campuses at once as asyncio tasks. Each campus's
+    stages run in a worker thread, so while one campus waits on an Apps
+    Script call (which releases the GIL) another campus's pandas work runs.
+    Returns the status dicts in the order the campuses finish"""
+    loop = asyncio.get_running_loop()
+    results = []
+    with ThreadPoolExecutor(max_workers=limit) as executor:
+        tasks = [
+            loop.run_in_executor(
+                executor,
+                _run_campus_thread,
+                settings_file,
+                mode,
+                local_campus,
+                debug,
+                session,
+            )
+            for local_campus in campuses
+        ]
+        for task in asyncio.as_completed(tasks):
+            result = await task
+            print("===== {} ({}) =====".format(result["campus"], result["status"]))
+            print(result["output"], end="", flush=True)
+            results.append(result)
+    return results
+
+
+def _print_status_table(results):
+    """Prints a one line summary per campus at the end of a pooled run"""
+    width = max([len("Campus")] + [len(r["campus"]) for r in results])
+    print("{:<{w}}  {:<6}  {:>8}".format("Campus", "Status", "Seconds", w=width))
+    for r in results:
+        print(
+            "{:<{w}}  {:<6}  {:>8.1f}".format(
+                r["campus"], r["status"], r["seconds"], w=width
+            )
+        )
+
+
+def all_main(settings_file, mode, campus, debug, skip, workers=1, session=None,
+             async_campuses=0, script_limit=4):
+    """Meta function to call the below for each campus, looping through
+    campuses in series, (if workers > 1) in a pool of processes or (if
+    async_campuses > 0) as asyncio tasks with that many campuses in flight
+    and at most script_limit Apps Script calls at once.
+    Returns the number of campuses that failed"""
+    if session is None:
+        session = run_session.RunSession(settings_file)
+    config = session.config(campus)
     skiplist = skip.split(sep=",") if skip else []
 
+    # The journal records which campuses and stages finish so that a run
+    # that dies partway through can be continued with --resume
+    journal_folder = os.path.join(config["cache_folder"], "journal")
+    journal = None
+    if session.resume:
+        journal = RunJournal.find_unfinished(journal_folder, mode)
+        if debug:
+            if journal:
+                print("Resuming run {}".format(journal.run_id))
+            else:
+                print("No unfinished {} run to resume".format(mode))
+    if journal is None:
+        journal = RunJournal.start(journal_folder, mode)
+    session.journal = journal
+
+    campuses = []
     for local_campus in config["campus_list"]:
-        if local_campus not in skiplist:
+        if local_campus in skiplist:
             if debug:
-                print(local_campus)
-            main(settings_file, mode, local_campus, debug)
+                print("Skipping {}".format(local_campus))
+        elif journal.is_campus_done(local_campus):
+            if debug:
+                print(
+                    "Skipping {} (finished in {})".format(local_campus, journal.run_id)
+                )
         else:
+            campuses.append(local_campus)
+
+    if mode in stages.SERIAL_MODES and (workers > 1 or async_campuses > 0):
+        if debug:
+            print("Running the {} campuses one at a time".format(mode))
+        workers, async_campuses = 1, 0
+
+    # Campuses running at once share one set of Google credentials, got here
+    # (which may mean the OAuth flow) before any of them start
+    credentials = None
+    if (
+        (workers > 1 or async_campuses > 0)
+        and stages.uses_google(mode)
+        and session.script_backend() is None
+    ):
+        from modules import googleapi
+
+        credentials = googleapi.get_credentials()
+
+    if async_campuses > 0:
+        if debug:
+            print(
+                "Running {} campuses, {} at a time, with up to {} Apps Script "
+                "calls at once".format(len(campuses), async_campuses, script_limit)
+            )
+        from modules import googleapi
+
+        googleapi.set_script_limit(script_limit)
+        stdout, stderr = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = _ThreadOutput(stdout), _ThreadOutput(stderr)
+        try:
+            results = asyncio.run(
+                _run_campuses_async(
+                    settings_file, mode, campuses, debug, session, async_campuses
+                )
+            )
+        finally:
+            sys.stdout, sys.stderr = stdout, stderr
+        return _finish_concurrent_run(results, campuses, journal)
+
+    if workers <= 1:
+        for local_campus in campuses:
             if debug:
-                print("Skipping {}".format(local_campus))
+                print(local_campus)
+            main(settings_file, mode, local_campus, debug, session)
+        journal.finish()
+        return 0
+
+    if debug:
+        print("Running {} campuses with {} workers".format(len(campuses), workers))
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(session, credentials),
+    ) as pool:
+        futures = [
+            pool.submit(_run_campus, settings_file, mode, local_campus, debug)
+            for local_campus in campuses
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            print("===== {} ({}) =====".format(result["campus"], result["status"]))
+            print(result["output"], end="", flush=True)
+            profiling.add_records(result["records"])
+            results.append(result)
+    return _finish_concurrent_run(results, campuses, journal)
 
 
-def main(settings_file, mode, campus, debug):
+def _finish_concurrent_run(results, campuses, journal):
+    """Prints the status table for a pooled or async run and marks the
+    journal finished if every campus succeeded. Returns the failure count"""
+    # Report in campus_list order regardless of completion order
+    results.sort(key=lambda r: campuses.index(r["campus"]))
+    _print_status_table(results)
+    failures = sum(r["status"] != "ok" for r in results)
+    if not failures:
+        journal.finish()
+    return failures
+
+
+def main(settings_file, mode, campus, debug, session=None):
     """Master control file for processing awards:
     1. Reads the settings file for details about other file sources
     2. Processes file sources and then pushes to Google Docs:
@@ -38,127 +284,70 @@ def main(settings_file, mode, campus, debug):
     *3. Optionally, create Excel/PDF reports for each campus
 
     **Note that the * items are not yet implemented
+
+    If a RunSession is passed, the settings and csv inputs are shared with
+    the other campuses in the run instead of being re-read
     """
-    # Note: comments in the all mode obviously apply to the subset modes
-    if mode == "all":
-        config = filework.process_config(settings_file, campus)
-        # Grab csv inputs
-        dfs = filework.read_dfs(config, debug)
-        # Add calculated fields to roster files
-        dfs["ros"] = basedata.add_strat_and_grs(
-            dfs["ros"], dfs["strat"], dfs["target"], dfs["acttosat"], campus, debug
-        )
-        # Add award and efc to the dfs dict
-        # These are the "blank" tables that don't yet have any award info
-        basedata.make_clean_gdocs(dfs, config, debug)
-        # Read the Google Docs if available and save to local file
-        # this adds live_efc and live_award to dfs
-        gdocwork.read_current_doc(dfs, campus, config, debug)
-        filework.save_live_dfs(dfs, campus, config, debug)
-        # Merge Google Docs info and write back to Google Docs
-        # Just the presence of rows (don't overwrite values)
-        gdocwork.sync_doc_rows(dfs, campus, config, debug)
-        # Refresh live data after syncing
-        gdocwork.read_current_doc(dfs, campus, config, debug)
-        # Update the Decisions tab (do after refreshing the award data tab)
-        gdocwork.refresh_decisions(dfs, campus, config, debug)
-        # Refresh live data after refresh_decisions for all
-        gdocwork.read_current_doc(dfs, campus, config, debug)
-        filework.save_live_dfs(dfs, campus, config, debug)
-        # Generate reports
-        reports.create_report_tables(dfs, campus, config, debug)
-        reports.create_excel(dfs, campus, config, debug)
-
-    elif mode == "save":
-        config = filework.process_config(settings_file, campus)
-        dfs = {"key": filework.read_doclist(config["key_file"])}
-        gdocwork.read_current_doc(dfs, campus, config, debug)
-        filework.save_live_dfs(dfs, campus, config, debug)
-
-    elif mode == "archive":
-        config = filework.process_config(settings_file, campus)
-        dfs = {"key": filework.read_doclist(config["key_file"])}
-        # Rather than read current, read the current and the local
-        filework.read_local_live_data(dfs, campus, config, debug)
-        for df in ["efc", "award", "decision"]:
-            if f"live_{df}" in dfs:
-                dfs[f"old_live_{df}"] = dfs[f"live_{df}"]
-        gdocwork.read_current_doc(dfs, campus, config, debug)
-        gdocwork.correct_headers(dfs, campus, config, debug)
-        # Finish correct_headers by adding a push to Apps script plus a re-read of the live_dfs
-        # filework.save_live_dfs(dfs, campus, config, debug)
-
-    elif mode == "make_new":
-        config = filework.process_config(settings_file, campus)
-        dfs = filework.read_dfs(config, debug)
-        dfs["ros"] = basedata.add_strat_and_grs(
-            dfs["ros"], dfs["strat"], dfs["target"], dfs["acttosat"], campus, debug
-        )
-        basedata.make_clean_gdocs(dfs, config, debug)
-        # Write a blank document if completely blank (returns None if doc exists)
-        new_key = gdocwork.write_new_doc(dfs, campus, config, debug)
-        # Save output files (if it's brand new)
-        if new_key:
-            filework.save_to_doclist(config["key_file"], campus, new_key)
-
-    elif mode == "push_local":
-        config = filework.process_config(settings_file, campus)
-        dfs = filework.read_dfs(config, debug)
-        dfs["ros"] = basedata.add_strat_and_grs(
-            dfs["ros"], dfs["strat"], dfs["target"], dfs["acttosat"], campus, debug
-        )
-        basedata.make_clean_gdocs(dfs, config, debug)
-        filework.read_local_live_data(dfs, campus, config, debug)
-        gdocwork.sync_doc_rows(dfs, campus, config, debug)
+    if session is None:
+        session = run_session.RunSession(settings_file)
+    if mode not in stages.MODES:
+        print("Invalid mode. Aborting")
+        return
+
+    # The stage definitions (modules/stages.py) describe what each mode does;
+    # the pipeline runs the ones needed for the mode's target stages,
+    # skipping any whose inputs haven't changed since the last run
+    config = session.config(campus)
+    targets = stages.MODES[mode]
+    needed = pipeline.external_inputs(pipeline.plan(stages.STAGES, targets))
+    if "inputs" in needed:
+        dfs = session.dfs(campus, debug)
+    else:
+        dfs = session.key_dfs(campus)
 
-    elif mode == "combine":
-        config = filework.process_config(settings_file, campus)
-        dfs = {"key": filework.read_doclist(config["key_file"])}
-        # Create combined outputs for the two main tables:
-        filework.combine_all_local_files(dfs, config, debug)
+    # Apps Script calls go to the emulator if the settings ask for it
+    backend = session.script_backend()
+    if backend is not None:
+        from modules import googleapi
 
-    elif mode == "refresh_decisions":
-        if debug:
-            print("Refreshing decisions (make sure you refreshed award data first!)")
-        config = filework.process_config(settings_file, campus)
-        dfs = filework.read_dfs(config, debug)
-        dfs["ros"] = basedata.add_strat_and_grs(
-            dfs["ros"], dfs["strat"], dfs["target"], dfs["acttosat"], campus, debug
-        )
-        filework.read_local_live_data(dfs, campus, config, debug)
-        gdocwork.refresh_decisions(dfs, campus, config, debug)
-
-    elif mode == "report":
-        config = filework.process_config(settings_file, campus)
-        dfs = filework.read_dfs(config, debug)
-        dfs["ros"] = basedata.add_strat_and_grs(
-            dfs["ros"], dfs["strat"], dfs["target"], dfs["acttosat"], campus, debug
+        googleapi.set_script_backend(backend)
+
+    # In a multi-campus run, record each finished stage in the run journal
+    # (and skip the ones a resumed run already finished)
+    journal = session.journal
+    completed = journal.completed_stages(campus) if journal else ()
+    on_stage_done = functools.partial(journal.stage_done, campus) if journal else None
+
+    # Optionally profile the whole campus run with cProfile
+    profiler = cProfile.Profile() if session.cprofile else None
+    if profiler:
+        profiler.enable()
+    with profiling.campus(campus):
+        pipeline.run(
+            stages.STAGES,
+            targets,
+            stages.ARTIFACTS,
+            dfs,
+            campus,
+            config,
+            debug,
+            os.path.join(config["cache_folder"], "pipeline"),
+            force=session.force,
+            completed=completed,
+            on_stage_done=on_stage_done,
         )
-        filework.read_local_live_data(dfs, campus, config, debug)
-        # Next line is a hack to read the "All" version of the decision tab instead of the campus one
-        if campus != "All":
-            filework.read_local_live_all_decision(dfs, campus, config, debug)
-        reports.create_report_tables(dfs, campus, config, debug)
-        reports.create_excel(dfs, campus, config, debug)
-
-    elif mode == "report_single":
-        config = filework.process_config(settings_file, campus)
-        dfs = filework.read_dfs(config, debug)
-        dfs["ros"] = basedata.add_strat_and_grs(
-            dfs["ros"], dfs["strat"], dfs["target"], dfs["acttosat"], campus, debug
+    if profiler:
+        profiler.disable()
+        os.makedirs(config["profile_folder"], exist_ok=True)
+        prof_file = os.path.join(
+            config["profile_folder"],
+            "{}-{}-{}.prof".format(session.run_id, mode, campus),
         )
-        filework.read_local_live_data(dfs, campus, config, debug)
-        # Next line is a hack to read the "All" version of the decision tab instead of the campus one
-        if campus != "All":
-            filework.read_local_live_all_decision(dfs, campus, config, debug)
-        reports.create_report_tables(dfs, campus, config, debug)
-        # First line creates a combined campus file
-        pdf_reports.create_pdfs(dfs, campus, config, debug, single_pdf=False)
-        # This line creates one per student
-        pdf_reports.create_pdfs(dfs, campus, config, debug)
-
-    else:
-        print("Invalid mode. Aborting")
+        profiler.dump_stats(prof_file)
+        if debug:
+            print("cProfile stats saved to {}".format(prof_file))
+    if journal:
+        journal.campus_done(campus)
 
 
 if __name__ == "__main__":
@@ -210,22 +399,129 @@ if __name__ == "__main__":
         default="all",
     )
 
+    parser.add_argument(
+        "-w",
+        "--workers",
+        dest="workers",
+        action="store",
+        type=int,
+        help='Number of campuses to run in parallel for an "All" call (default 1)',
+        default=1,
+    )
+
+    parser.add_argument(
+        "--async",
+        dest="async_campuses",
+        action="store",
+        type=int,
+        help='Run up to N campuses at once in this process for an "All" call, '
+        + "overlapping one campus's Google Doc calls with another's processing",
+        default=0,
+    )
+
+    parser.add_argument(
+        "--script-limit",
+        dest="script_limit",
+        action="store",
+        type=int,
+        help="Most Apps Script calls to have running at once with --async "
+        + "(default 4)",
+        default=4,
+    )
+
+    parser.add_argument(
+        "-f",
+        "--force",
+        dest="force",
+        action="store_true",
+        default=False,
+        help="Rerun every stage even if its inputs are unchanged since the last run",
+    )
+
+    parser.add_argument(
+        "--resume",
+        dest="resume",
+        action="store_true",
+        default=False,
+        help='Continue the last unfinished "All" run of this mode, skipping the '
+        + "campuses and stages it already finished (only for -ca All, and not "
+        + "with -m combine)",
+    )
+
+    parser.add_argument(
+        "--profile",
+        dest="profile",
+        action="store_true",
+        default=False,
+        help="Record wall and CPU time for every stage and Apps Script call "
+        + "and save them as a json report",
+    )
+
+    parser.add_argument(
+        "--cprofile",
+        dest="cprofile",
+        action="store_true",
+        default=False,
+        help="Also save a cProfile .prof file per campus",
+    )
+
+    parser.add_argument(
+        "--memory-report",
+        dest="memory_report",
+        action="store_true",
+        default=False,
+        help="Print the memory used by each table as read and after its dtypes "
+        + "are set",
+    )
+
     args = parser.parse_args()
+    if args.async_campuses and args.workers > 1:
+        parser.error("use either --workers or --async, not both")
+    if args.resume and (args.campus != "All" or args.mode == "combine"):
+        parser.error("--resume only continues -ca All runs of a per-campus mode")
+    if args.profile:
+        profiling.enable()
+    if args.memory_report:
+        filework.enable_memory_report()
+    session = run_session.RunSession(
+        args.settings_file, force=args.force, resume=args.resume,
+        cprofile=args.cprofile, network_roster=(args.campus == "All"),
+        campus_apps=True,
+    )
+    failures = 0
 
     if args.campus == "All" and (args.mode not in
                                  ["combine", "report", "archive"]):
         # Special meta_function to loop through all
-        all_main(args.settings_file, args.mode, args.campus, args.debug, args.skip)
+        failures = all_main(
+            args.settings_file, args.mode, args.campus, args.debug, args.skip,
+            args.workers, session, args.async_campuses, args.script_limit,
+        )
     elif args.campus == "All" and args.mode == "report":
         # Call for the entire network
-        main(args.settings_file, args.mode, "All", args.debug)
+        main(args.settings_file, args.mode, "All", args.debug, session)
         # Then loop through all campuses individually
-        all_main(args.settings_file, args.mode, args.campus, args.debug, args.skip)
+        failures = all_main(
+            args.settings_file, args.mode, args.campus, args.debug, args.skip,
+            args.workers, session, args.async_campuses, args.script_limit,
+        )
     elif args.campus == "All" and args.mode == "archive":
         #take a snapshot of the current files in the live_backups folder
         # Then loop through all campuses individually
-        all_main(args.settings_file, args.mode, args.campus, args.debug, args.skip)
+        failures = all_main(
+            args.settings_file, args.mode, args.campus, args.debug, args.skip,
+            args.workers, session, args.async_campuses, args.script_limit,
+        )
         # Then save off the archive
     else:
         campus = "All" if args.mode == "combine" else args.campus
-        main(args.settings_file, args.mode, campus, args.debug)
+        main(args.settings_file, args.mode, campus, args.debug, session)
+
+    if args.profile:
+        profiling.write_report(
+            session.config("All")["profile_folder"],
+            session.run_id,
+            args.mode,
+            args.debug,
+        )
+    sys.exit(1 if failures else 0)